@@ -1,15 +1,43 @@
 ﻿# chat_core.py
 
-import json
+import hashlib
+import importlib.util
 import logging
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
-import ollama
-import PyPDF2
 import docx
 import pandas as pd
 
+try:
+    import fitz  # PyMuPDF: C-backed, much faster page extraction
+except ImportError:  # no native wheel available – fall back to pure-Python parser
+    fitz = None
+    import PyPDF2
+
+try:
+    from charset_normalizer import from_bytes as detect_charset
+except ImportError:
+    detect_charset = None
+
+try:
+    import xxhash  # SIMD non-cryptographic hash, for document dedup
+except ImportError:
+    xxhash = None
+
+try:
+    import tiktoken  # Rust-backed BPE tokenizer, for real token counts
+except ImportError:
+    tiktoken = None
+
+from utilities import json_utils
+from utilities.ollama_utils import get_async_client, get_client, verify_model
+
 # Logging setup
 logging.basicConfig(
     level=logging.INFO,
@@ -17,6 +45,126 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# PDFs with at least this many pages are extracted in a process pool;
+# below it, worker spin-up costs more than it saves.
+PARALLEL_PDF_MIN_PAGES = 16
+# Minimum pages handed to each worker
+PDF_PAGES_PER_WORKER = 8
+
+# Above this many rows, CSV summary statistics are computed on a sample
+CSV_STATS_SAMPLE_ROWS = 50_000
+
+# pyarrow's CSV reader is several times faster on large files when installed
+_CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") else "c"
+
+# Page-text cleanup, applied once at load time: rejoin words hyphenated
+# across line breaks, collapse runs of spaces/tabs/form feeds and of blank lines
+_HYPH_RE = re.compile(r"-\n(\w)")
+_WS_RE = re.compile(r"[ \t\f\v]+")
+_LN_RE = re.compile(r"\n{3,}")
+
+# Bytes sampled from the start of a text file to detect its encoding
+TXT_SNIFF_BYTES = 64 * 1024
+
+
+def _utf8_boundary(data: bytes) -> bytes:
+    """
+    Trim a trailing, incomplete UTF-8 sequence from a byte prefix so an
+    encoding sniffer isn't misled by a character cut in half.
+    """
+    lead = len(data) - 1
+    # Back over up to 3 continuation bytes to the lead byte they follow
+    while lead > 0 and len(data) - lead <= 3 and 0x80 <= data[lead] <= 0xBF:
+        lead -= 1
+    if lead < 0 or data[lead] < 0xC0:
+        return data
+    needed = 2 if data[lead] < 0xE0 else 3 if data[lead] < 0xF0 else 4
+    return data if len(data) - lead >= needed else data[:lead]
+
+# WordprocessingML tags, for walking DOCX XML directly: text-bearing run
+# children (text, tab, line/carriage breaks) and what python-docx's .text maps them to
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_T = _W_NS + "t"
+_W_RUN_TEXT = {_W_NS + "tab": "\t", _W_NS + "br": "\n", _W_NS + "cr": "\n"}
+
+# Outermost paragraphs (body, tables, content controls) and the run content
+# of each, leaving out paragraphs nested in text boxes so nothing is emitted twice
+_DOCX_PARAS_XPATH = ".//w:p[not(ancestor::w:p)]"
+_DOCX_RUN_TEXT_XPATH = (
+    ".//w:r[not(ancestor::w:txbxContent)]"
+    "/*[self::w:t or self::w:tab or self::w:br or self::w:cr]"
+)
+
+# Approximate per-message serialization overhead ({"role": ..., "content": ...})
+MESSAGE_OVERHEAD_CHARS = 20
+MESSAGE_OVERHEAD_TOKENS = MESSAGE_OVERHEAD_CHARS // 4
+
+# Share of max_context_tokens the system prompt + history window may fill
+# before the oldest turns are dropped from the payload
+HISTORY_BUDGET_FRACTION = 0.7
+
+
+def _pages_text(doc, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Return (page_index, text) for pages [start, end) of an open fitz document.
+    """
+    return [(i, doc[i].get_text("text")) for i in range(start, end)]
+
+
+@lru_cache(maxsize=1)
+def _token_encoding():
+    """
+    cl100k_base encoding, or None if tiktoken is missing or its BPE file
+    can't be loaded (it is downloaded on first use).
+    """
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable ({e}); falling back to chars/4 estimate")
+        return None
+
+
+def _normalize_page_text(text: str) -> str:
+    text = _HYPH_RE.sub(r"\1", text)
+    text = _WS_RE.sub(" ", text)
+    return _LN_RE.sub("\n\n", text)
+
+
+def _file_digest(path: str) -> str:
+    """
+    Content hash of a file's bytes, read in 1 MB chunks.
+    """
+    h = xxhash.xxh3_64() if xxhash is not None else hashlib.blake2b(digest_size=8)
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _extract_pages(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Process-pool worker: opens its own document, since fitz documents
+    cannot be shared across processes.
+    """
+    with fitz.open(pdf_path) as doc:
+        return _pages_text(doc, start, end)
+
+
+def _extract_pages_parallel(pdf_path: str, page_count: int) -> List[Tuple[int, str]]:
+    """
+    Shard the page range across CPU workers and merge results in page order.
+    """
+    workers = min(os.cpu_count() or 1, page_count // PDF_PAGES_PER_WORKER or 1)
+    step = -(-page_count // workers)  # ceil division
+    shards = [(s, min(s + step, page_count)) for s in range(0, page_count, step)]
+
+    with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+        futures = [pool.submit(_extract_pages, pdf_path, s, e) for s, e in shards]
+        # Futures are kept in shard order, so pages come back in index order
+        return [page for fut in futures for page in fut.result()]
+
 
 class OllamaChat:
     """
@@ -27,22 +175,50 @@ class OllamaChat:
     Designed to be reusable by both a CLI and a FastAPI server.
     """
     #qwen3:30b-a3b
-    def __init__(self, model: str = "qwen3:1.7b", max_context_tokens: int = 120_000):
+    def __init__(
+        self,
+        model: str = "qwen3:1.7b",
+        max_context_tokens: int = 120_000,
+        window_turns: int = 16,
+    ):
         self.model = model
         self.max_context_tokens = max_context_tokens
 
+        # Number of recent user/assistant turns sent to the model each request
+        self.window_turns = window_turns
+
         # Full conversation history: list of {"role": "user"|"assistant", "content": "..."}
         self.conversation_history: List[Dict[str, str]] = []
 
-        # Concatenated text of all loaded documents
-        self.document_context: str = ""
+        # Text of each loaded document (banner + content); joined lazily
+        # into document_context so repeated loads don't re-copy the whole context
+        self._doc_parts: List[str] = []
+        self._doc_context_cache: Optional[str] = None
+
+        # System message (instructions + documents), invalidated on document changes,
+        # and the token count of its non-document part (instructions + doc header)
+        self._system_cache: Optional[str] = None
+        self._prompt_tokens: Optional[int] = None
 
         # Names of loaded files
         self.loaded_files: List[str] = []
 
+        # Running token counters, so context checks are pure arithmetic;
+        # _turn_tokens holds each history message's share of _hist_tokens
+        self._doc_tokens = 0
+        self._hist_tokens = 0
+        self._turn_tokens: List[int] = []
+
+        # Content hash -> load metadata, so re-adding an identical file is a no-op
+        self._doc_hashes: Dict[str, Dict[str, object]] = {}
+
+        # Shared clients, so requests reuse pooled connections to the daemon
+        self._client = get_client()
+        self._aclient = get_async_client()
+
         # Verify model is present locally (will raise if missing)
         try:
-            ollama.show(self.model)
+            verify_model(self.model)
             logger.info(f"✓ Model {self.model} is ready")
         except Exception as e:
             logger.error(
@@ -51,21 +227,34 @@ class OllamaChat:
             )
             raise
 
+    @property
+    def document_context(self) -> str:
+        """
+        Concatenated text of all loaded documents.
+        """
+        if self._doc_context_cache is None:
+            self._doc_context_cache = "".join(self._doc_parts)
+        return self._doc_context_cache
+
     # ----------------------
     # Context / token helpers
     # ----------------------
     def _estimate_tokens(self, text: str) -> int:
         """
-        Rough token estimation: ≈ 1 token per 4 characters (English-ish).
+        Token count via tiktoken's cl100k_base when available (not the model's
+        own tokenizer, but close); otherwise ≈ 1 token per 4 characters.
         """
-        return len(text) // 4
+        enc = _token_encoding()
+        if enc is None:
+            return len(text) // 4
+        return len(enc.encode(text, disallowed_special=()))
 
     def _check_context_size(self) -> Dict[str, float]:
         """
         Compute current document + conversation token usage.
         """
-        doc_tokens = self._estimate_tokens(self.document_context)
-        conv_tokens = self._estimate_tokens(json.dumps(self.conversation_history))
+        doc_tokens = self._doc_tokens
+        conv_tokens = self._hist_tokens
         total_tokens = doc_tokens + conv_tokens
 
         return {
@@ -85,36 +274,86 @@ class OllamaChat:
         Extract text from a PDF file, with page markers.
         """
         try:
-            text = ""
-            with open(pdf_path, "rb") as file:
-                reader = PyPDF2.PdfReader(file)
-                for page_num, page in enumerate(reader.pages):
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += f"\n--- Page {page_num + 1} ---\n{page_text}"
-            return text
+            if fitz is None:
+                pages = self._pypdf2_pages(pdf_path)
+                page_count = len(pages)
+            else:
+                with fitz.open(pdf_path) as doc:
+                    page_count = doc.page_count
+                    if page_count < PARALLEL_PDF_MIN_PAGES:
+                        pages = _pages_text(doc, 0, page_count)
+
+            if fitz is not None and page_count >= PARALLEL_PDF_MIN_PAGES:
+                try:
+                    pages = _extract_pages_parallel(pdf_path, page_count)
+                except Exception as e:
+                    logger.warning(f"Parallel PDF extraction failed ({e}); retrying sequentially")
+                    pages = _extract_pages(pdf_path, 0, page_count)
+
+            # Collect pieces and join once; no quadratic string growth per page
+            parts: List[str] = []
+            for page_num, page_text in pages:
+                if page_text:
+                    page_text = _normalize_page_text(page_text)
+                    parts.append(f"\n--- Page {page_num + 1} ---\n{page_text}")
+            return "".join(parts)
         except Exception as e:
             logger.error(f"Error reading PDF {pdf_path}: {e}")
             raise
 
+    def _pypdf2_pages(self, pdf_path: str) -> List[Tuple[int, str]]:
+        """
+        Fallback page extraction for environments without PyMuPDF.
+        """
+        with open(pdf_path, "rb") as file:
+            reader = PyPDF2.PdfReader(file)
+            return [(i, page.extract_text()) for i, page in enumerate(reader.pages)]
+
     def load_docx(self, docx_path: str) -> str:
         """
         Extract text from a DOCX file.
         """
         try:
             doc = docx.Document(docx_path)
-            text = "\n\n".join(
-                paragraph.text for paragraph in doc.paragraphs if paragraph.text
-            )
-            return text
+            # lxml XPath over the body XML instead of python-docx's
+            # per-paragraph .text property (also picks up text inside tables)
+            paragraphs = []
+            for p in doc.element.body.xpath(_DOCX_PARAS_XPATH):
+                text = "".join(
+                    (node.text or "") if node.tag == _W_T else _W_RUN_TEXT[node.tag]
+                    for node in p.xpath(_DOCX_RUN_TEXT_XPATH)
+                )
+                if text:
+                    paragraphs.append(text)
+            return "\n\n".join(paragraphs)
         except Exception as e:
             logger.error(f"Error reading DOCX {docx_path}: {e}")
             raise
 
     def load_txt(self, txt_path: str) -> str:
         """
-        Load a text file with basic encoding fallback.
+        Load a text file as UTF-8 when it is valid UTF-8, otherwise decode it
+        once with an encoding sniffed from its first bytes; falls back to
+        trying common encodings in turn.
         """
+        if detect_charset is not None:
+            with open(txt_path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return ""
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    # Strict UTF-8 first: a sniffed prefix can't rule it in or out
+                    try:
+                        return str(mm, "utf-8-sig")
+                    except UnicodeDecodeError:
+                        pass
+                    best = detect_charset(_utf8_boundary(mm[:TXT_SNIFF_BYTES])).best()
+                    if best is not None:
+                        encoding = best.encoding
+                        # A pure-ASCII prefix says nothing about later bytes
+                        if encoding == "ascii":
+                            encoding = "utf-8"
+                        return str(mm, encoding, "replace")
+
         encodings = ["utf-8", "latin-1", "cp1252", "iso-8859-1"]
         for enc in encodings:
             try:
@@ -129,7 +368,21 @@ class OllamaChat:
         Summarize a CSV file as readable text instead of dumping the whole thing.
         """
         try:
-            df = pd.read_csv(csv_path)
+            try:
+                df = pd.read_csv(csv_path, engine=_CSV_ENGINE)
+            except ValueError:
+                # pyarrow rejects some malformed files the C parser tolerates
+                if _CSV_ENGINE == "c":
+                    raise
+                df = pd.read_csv(csv_path)
+
+            # Stats on numeric columns only (object columns if there are none),
+            # median only, and on a sample for very long files
+            stats_df = df.select_dtypes(include="number")
+            if stats_df.columns.empty:
+                stats_df = df
+            if len(stats_df) > CSV_STATS_SAMPLE_ROWS:
+                stats_df = stats_df.sample(n=CSV_STATS_SAMPLE_ROWS, random_state=0)
 
             text = "CSV File Summary:\n"
             text += f"Rows: {len(df)}, Columns: {len(df.columns)}\n"
@@ -139,7 +392,9 @@ class OllamaChat:
             text += "Data Types:\n"
             text += f"{df.dtypes.to_string()}\n\n"
             text += "Basic Statistics:\n"
-            text += f"{df.describe().to_string()}"
+            if len(df) > CSV_STATS_SAMPLE_ROWS:
+                text += f"(sampled {CSV_STATS_SAMPLE_ROWS} of {len(df)} rows)\n"
+            text += f"{stats_df.describe(percentiles=[0.5]).to_string()}"
 
             return text
         except Exception as e:
@@ -151,8 +406,9 @@ class OllamaChat:
         Add a document file into the running context.
 
         - Supports PDF, DOCX/DOC, TXT, CSV.
-        - Appends text into self.document_context with a clear header.
+        - Appends text into the document context with a clear header.
         - Tracks approximate context usage and logs warnings if high.
+        - Skips files whose bytes match a document already loaded.
 
         Returns summary metadata about the loaded file.
         """
@@ -161,6 +417,12 @@ class OllamaChat:
         if not path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
 
+        digest = _file_digest(str(path))
+        cached = self._doc_hashes.get(digest)
+        if cached is not None:
+            logger.info(f"✓ {path.name} already loaded as {cached['filename']}; skipping")
+            return dict(cached)
+
         # Size in MB (for logging / UX)
         file_size_mb = path.stat().st_size / (1024 * 1024)
         if file_size_mb > 10:
@@ -190,11 +452,15 @@ class OllamaChat:
                 + "=" * 60
                 + "\n"
             )
-            self.document_context += banner + content
+            estimated_tokens = self._estimate_tokens(content)
+            self._doc_parts.append(banner + content)
+            self._doc_context_cache = None
+            self._system_cache = None
+            self._prompt_tokens = None
+            self._doc_tokens += estimated_tokens
             self.loaded_files.append(path.name)
 
             context_info = self._check_context_size()
-            estimated_tokens = self._estimate_tokens(content)
 
             result = {
                 "filename": path.name,
@@ -214,7 +480,8 @@ class OllamaChat:
                     f"⚠ Context usage high: {context_info['utilization_pct']:.1f}%"
                 )
 
-            return result
+            self._doc_hashes[digest] = result
+            return dict(result)
 
         except Exception as e:
             logger.error(f"Failed to load {file_path}: {e}")
@@ -224,7 +491,12 @@ class OllamaChat:
         """
         Clear all loaded documents from context.
         """
-        self.document_context = ""
+        self._doc_parts = []
+        self._doc_context_cache = None
+        self._system_cache = None
+        self._prompt_tokens = None
+        self._doc_tokens = 0
+        self._doc_hashes = {}
         self.loaded_files = []
         logger.info("✓ Cleared all documents")
 
@@ -236,6 +508,8 @@ class OllamaChat:
         Clear conversation history but leave documents loaded.
         """
         self.conversation_history = []
+        self._hist_tokens = 0
+        self._turn_tokens = []
         logger.info("✓ Cleared conversation history")
 
     def reset(self) -> None:
@@ -243,19 +517,23 @@ class OllamaChat:
         Clear both conversation history and documents.
         """
         self.conversation_history = []
-        self.document_context = ""
+        self._hist_tokens = 0
+        self._turn_tokens = []
+        self._doc_parts = []
+        self._doc_context_cache = None
+        self._system_cache = None
+        self._prompt_tokens = None
+        self._doc_tokens = 0
+        self._doc_hashes = {}
         self.loaded_files = []
         logger.info("✓ Reset complete")
 
-    def _build_messages(self) -> List[Dict[str, str]]:
+    def _system_prompt(self) -> str:
         """
-        Build the list of messages to send to Ollama, including:
-
-          - One system message with base study instructions (always).
-          - Optional document context if any docs are loaded.
-          - Full conversation history (user + assistant turns).
+        System message content, rebuilt only when the loaded documents change.
         """
-        messages: List[Dict[str, str]] = []
+        if self._system_cache is not None:
+            return self._system_cache
 
         # Base study + no-charts instruction (always on)
         base_system = (
@@ -266,23 +544,80 @@ class OllamaChat:
             "with a written/text explanation instead."
         )
 
-        if self.document_context:
-            doc_system = (
+        if self._doc_parts:
+            doc_header = (
                 "You have access to the following documents. Use them to answer "
                 "questions when relevant. If the documents don't contain the answer, "
                 "use your general knowledge to help the user.\n"
                 "When citing information from documents, mention which document you "
                 "are referencing.\n\n"
-                f"{self.document_context}"
             )
-            system_content = base_system + "\n\n" + doc_system
+            # Joined straight from the parts: one copy of the documents, not two
+            self._system_cache = "".join([base_system, "\n\n", doc_header, *self._doc_parts])
+            self._prompt_tokens = self._estimate_tokens(base_system + "\n\n" + doc_header)
         else:
-            system_content = base_system
+            self._system_cache = base_system
+            self._prompt_tokens = self._estimate_tokens(base_system)
+        return self._system_cache
+
+    def _build_messages(self) -> List[Dict[str, str]]:
+        """
+        Build the list of messages to send to Ollama, including:
+
+          - One system message with base study instructions (always).
+          - Optional document context if any docs are loaded.
+          - The most recent window_turns of conversation history, trimmed
+            further (oldest first) if it would crowd the context budget,
+            and always starting on a user turn.
 
+        The full history is kept on the instance for export.
+        """
+        messages: List[Dict[str, str]] = []
+
+        system_content = self._system_prompt()
         messages.append({"role": "system", "content": system_content})
-        messages.extend(self.conversation_history)
+
+        if self.window_turns > 0:
+            window = self.conversation_history[-2 * self.window_turns:]
+        else:
+            # No past turns requested: only the pending user message
+            # (a [-0:] slice would send the whole history)
+            window = self.conversation_history[-1:]
+        # System size from the running counters; the documents are never re-encoded
+        budget = (
+            int(self.max_context_tokens * HISTORY_BUDGET_FRACTION)
+            - (self._prompt_tokens + self._doc_tokens + MESSAGE_OVERHEAD_TOKENS)
+        )
+        window_tokens = self._turn_tokens[len(self._turn_tokens) - len(window):]
+        window_total = sum(window_tokens)
+        start = 0
+        # Always keep at least the latest turn (the pending user message)
+        while start < len(window) - 1 and window_total > budget:
+            window_total -= window_tokens[start]
+            start += 1
+        # Open on a user turn, never on an assistant reply cut from its question
+        while start < len(window) - 1 and window[start]["role"] != "user":
+            start += 1
+
+        messages.extend(window[start:])
         return messages
 
+    def _record_turn(self, role: str, content: str) -> None:
+        """
+        Append a turn to history and keep the running token counter in sync.
+        """
+        tokens = self._estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+        self.conversation_history.append({"role": role, "content": content})
+        self._turn_tokens.append(tokens)
+        self._hist_tokens += tokens
+
+    def _rollback_user_turn(self) -> None:
+        """
+        Drop the trailing user turn after a failed model call.
+        """
+        if self.conversation_history and self.conversation_history[-1]["role"] == "user":
+            self.conversation_history.pop()
+            self._hist_tokens -= self._turn_tokens.pop()
 
     def chat(self, user_message: str, temperature: float = 0.7) -> str:
         """
@@ -299,14 +634,12 @@ class OllamaChat:
             )
 
         # Append user message to history
-        self.conversation_history.append(
-            {"role": "user", "content": user_message}
-        )
+        self._record_turn("user", user_message)
 
         messages = self._build_messages()
 
         try:
-            response = ollama.chat(
+            response = self._client.chat(
                 model=self.model,
                 messages=messages,
                 stream=False,
@@ -315,27 +648,21 @@ class OllamaChat:
             full_response = response["message"]["content"]
 
             # Save assistant turn
-            self.conversation_history.append(
-                {"role": "assistant", "content": full_response}
-            )
+            self._record_turn("assistant", full_response)
 
             return full_response
 
         except Exception as e:
             logger.error(f"Error during chat: {e}")
             # Roll back the last user message on failure
-            if self.conversation_history and self.conversation_history[-1]["role"] == "user":
-                self.conversation_history.pop()
+            self._rollback_user_turn()
             raise
 
-    def stream_chat(self, user_message: str, thinking_mode: str = "fast"):
+    def _begin_stream(self, user_message: str, thinking_mode: str) -> Dict[str, object]:
         """
-        Streaming chat generator for use by servers:
-
-          for chunk in ollama_chat.stream_chat("hello", thinking_mode="fast"):
-              ...
-
-        - thinking_mode controls generation style (fast vs deep) for the SAME model.
+        Shared setup for stream_chat / astream_chat: checks context usage,
+        picks generation settings, records the user turn, and returns the
+        keyword arguments for the client's chat() call.
         """
         context_info = self._check_context_size()
         if context_info["utilization_pct"] > 90:
@@ -354,39 +681,99 @@ class OllamaChat:
             think = False
 
         # Append user message, then build messages
-        self.conversation_history.append(
-            {"role": "user", "content": user_message}
-        )
-        messages = self._build_messages()
+        self._record_turn("user", user_message)
+
+        return {
+            "model": self.model,
+            "messages": self._build_messages(),
+            "stream": True,
+            "think": think,
+            "options": {"temperature": temperature, "num_predict": num_predict},
+        }
 
-        full_response = ""
+    def stream_chat(self, user_message: str, thinking_mode: str = "fast"):
+        """
+        Streaming chat generator (blocking; used by the CLI):
+
+          for chunk in ollama_chat.stream_chat("hello", thinking_mode="fast"):
+              ...
+
+        - thinking_mode controls generation style (fast vs deep) for the SAME model.
+        """
+        request = self._begin_stream(user_message, thinking_mode)
+        # Chunks are joined once at the end instead of growing a string per token
+        chunks: List[str] = []
+        streamed_tokens = 0
+        completed = False
 
         try:
-            stream = ollama.chat(
-                model=self.model,
-                messages=messages,
-                stream=True,
-                think=think,
-                options={"temperature": temperature, "num_predict": num_predict},
-            )
-            for chunk in stream:
+            for chunk in self._client.chat(**request):
                 msg = chunk.get("message", {}) or {}
                 text = msg.get("content", "") or ""
                 if text:
-                    full_response += text
+                    chunks.append(text)
+                    tokens = self._estimate_tokens(text)
+                    streamed_tokens += tokens
+                    self._hist_tokens += tokens
                     yield text
+            completed = True
 
-            # On success, record assistant response
+        except Exception as e:
+            logger.error(f"Error during streaming chat: {e}")
+            # On error, roll back last user message
+            self._rollback_user_turn()
+            raise
+        finally:
+            self._end_stream(chunks, streamed_tokens, completed)
+
+    def _end_stream(self, chunks: List[str], streamed_tokens: int, completed: bool) -> None:
+        """
+        Close out a streamed reply. On success, record the joined chunks as the
+        assistant turn; otherwise un-count the tokens tallied while streaming.
+        """
+        if completed:
             self.conversation_history.append(
-                {"role": "assistant", "content": full_response}
+                {"role": "assistant", "content": "".join(chunks)}
             )
+            self._turn_tokens.append(streamed_tokens + MESSAGE_OVERHEAD_TOKENS)
+            self._hist_tokens += MESSAGE_OVERHEAD_TOKENS
+        else:
+            self._hist_tokens -= streamed_tokens
+
+    async def astream_chat(self, user_message: str, thinking_mode: str = "fast"):
+        """
+        Async streaming chat generator for servers running on an event loop:
+
+          async for chunk in ollama_chat.astream_chat("hello", thinking_mode="fast"):
+              ...
+
+        Same behaviour as stream_chat, but waiting on the model doesn't hold a thread.
+        """
+        request = self._begin_stream(user_message, thinking_mode)
+        # Chunks are joined once at the end instead of growing a string per token
+        chunks: List[str] = []
+        streamed_tokens = 0
+        completed = False
+
+        try:
+            async for chunk in await self._aclient.chat(**request):
+                msg = chunk.get("message", {}) or {}
+                text = msg.get("content", "") or ""
+                if text:
+                    chunks.append(text)
+                    tokens = self._estimate_tokens(text)
+                    streamed_tokens += tokens
+                    self._hist_tokens += tokens
+                    yield text
+            completed = True
 
         except Exception as e:
             logger.error(f"Error during streaming chat: {e}")
             # On error, roll back last user message
-            if self.conversation_history and self.conversation_history[-1]["role"] == "user":
-                self.conversation_history.pop()
+            self._rollback_user_turn()
             raise
+        finally:
+            self._end_stream(chunks, streamed_tokens, completed)
 
     # -------------
     # Introspection
@@ -413,6 +800,6 @@ class OllamaChat:
             "loaded_files": self.loaded_files,
             "conversation": self.conversation_history,
         }
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(export_data, f, indent=2, ensure_ascii=False)
+        with open(filepath, "wb") as f:
+            f.write(json_utils.dumps(export_data, indent=True))
         logger.info(f"✓ Exported conversation to {filepath}")
@@ -1,11 +1,12 @@
 ﻿
-import ollama
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Any
 import json
 import logging
-import base64
+import os
 
+from utilities.ollama_utils import get_client, verify_model
 from utilities.prompt_config import get_system_prompt
 
 # =============================================================================
@@ -30,6 +31,9 @@ Your role is to:
 
 Be thorough, precise, and objective in your analysis. When uncertain, acknowledge limitations rather than guessing."""
 
+# Number of image payloads kept in memory between analyze() calls
+IMAGE_CACHE_SIZE = 8
+
 # =============================================================================
 #  Logging Setup
 # =============================================================================
@@ -37,6 +41,13 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=IMAGE_CACHE_SIZE)
+def _read_image(path: str, mtime: float) -> bytes:
+    """Read image bytes; keyed on mtime so an edited file is re-read."""
+    with open(path, "rb") as f:
+        return f.read()
+
+
 # =============================================================================
 # ImageAnalysisChat Class
 # =============================================================================
@@ -44,18 +55,21 @@ class ImageAnalysisChat:
     def __init__(self, model: str = DEFAULT_MODEL):
         self.model = model
         self.conversation_history: List[Dict[str, Any]] = []
-        self.loaded_images: List[Dict[str, str]] = []
+        self.loaded_images: List[Dict[str, Any]] = []
+
+        # Shared client, so requests reuse pooled connections to the daemon
+        self._client = get_client()
 
         # Verify model is available
         try:
-            ollama.show(self.model)
+            verify_model(self.model)
             logger.info(f"✓ Vision model **{self.model}** is ready")
         except Exception as e:
             logger.error(f"Model **{self.model}** not found. Pull it with: ollama pull {self.model}")
             raise
 
     def load_image(self, image_path: str) -> Dict[str, Any]:
-        """Load an image file and encode it in base64."""
+        """Register an image file; its bytes are read lazily by analyze()."""
         path = Path(image_path)
 
         if not path.exists():
@@ -74,15 +88,10 @@ class ImageAnalysisChat:
             logger.warning(f"Large image detected: {file_size_mb:.1f}MB - may take time to process")
 
         try:
-            # Read and encode image as base64
-            with open(image_path, "rb") as img_file:
-                image_data = base64.b64encode(img_file.read()).decode("utf-8")
-
-            # Store image info
+            # Store image info only; bytes stay on disk until analyzed
             image_info = {
                 "filename": path.name,
                 "path": str(path),
-                "data": image_data,
             }
             self.loaded_images.append(image_info)
 
@@ -112,11 +121,14 @@ class ImageAnalysisChat:
             logger.warning("No images loaded.")
             return "Please load an image first."
 
-        # Prepare the user message with images
+        # Prepare the user message with images (raw bytes; ollama accepts them directly)
         user_msg = {
             "role": "user",
             "content": user_message,
-            "images": [img["data"] for img in self.loaded_images],
+            "images": [
+                _read_image(img["path"], os.path.getmtime(img["path"]))
+                for img in self.loaded_images
+            ],
         }
 
         # Add user message to history
@@ -137,7 +149,7 @@ class ImageAnalysisChat:
 
         # Get response from Ollama
         try:
-            response = ollama.chat(
+            response = self._client.chat(
                 model=self.model,
                 messages=messages,
                 stream=stream,
@@ -198,7 +210,7 @@ class ImageAnalysisChat:
             "model": self.model,
             "loaded_images": [img["filename"] for img in self.loaded_images],
             "conversation": [
-                {k: v for k, v in msg.items() if k != "images"}  # Exclude base64 data
+                {k: v for k, v in msg.items() if k != "images"}  # Exclude raw image data
                 for msg in self.conversation_history
             ],
         }
@@ -1,8 +1,6 @@
 # server.py
 
-from image_v1 import DEFAULT_MODEL as IMAGE_DEFAULT_MODEL
-from vibe_coding import DEFAULT_MODEL as VIBE_DEFAULT_MODEL, VibeCodingChat
-from web_chat import DEFAULT_MODEL as WEB_DEFAULT_MODEL, WebChatSession
+from functools import lru_cache
 
 # Load model configuration from external config file
 def _load_model_config():
@@ -19,45 +17,58 @@ def _load_model_config():
             "web": {"default": "qwen2.5:7b"}
         }
 
-# Defer loading until after imports
-_MODEL_CONFIG = None
-
+# Loaded once (warmed in lifespan); the file is only read after imports
+@lru_cache(maxsize=1)
 def get_model_config():
-    global _MODEL_CONFIG
-    if _MODEL_CONFIG is None:
-        _MODEL_CONFIG = _load_model_config()
-    return _MODEL_CONFIG
+    return _load_model_config()
 
 # Legacy constant for backwards compatibility
 CHAT_DEFAULT_MODEL = "qwen3:1.7b"  # Overridden by config if available
 
 import os
-import io
+import sys
 import json
+import asyncio
 import time
 import shutil
+import sqlite3
+import tempfile
 import threading
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
 from datetime import date
-from typing import List, Optional, AsyncGenerator
+from typing import TYPE_CHECKING, List, Optional, AsyncGenerator
 
-import fitz  # PyMuPDF (kept for compatibility. TODO: Remove?)
-import ollama
-import requests
+# Engine modules (and ollama/PyMuPDF behind them) are imported on
+# first use, so endpoints like /api/health and /api/chats start up cheaply
+import aiofiles
+import aiofiles.os
+import httpx
 from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from utilities.ollama_utils import extract_model_names
+from utilities.ollama_utils import fetch_model_names, forget_model
 from utilities.power_usage import (
     get_cpu_power_usage,
     get_gpu_power_usage,
     get_power_usage_history,
     get_default_power_usages,
+    append_power_entry,
+    migrate_power_history,
 )
 from utilities.date_time import get_datetime
+from utilities.chat_index import ChatIndex, message_text
+from utilities.engine_cache import LRUEngines
+from utilities.file_utils import atomic_write, atomic_write_async, tmp_path
+from utilities import json_utils
 
-# Shared chat engine with memory + doc window
-from chat_core import OllamaChat
+if TYPE_CHECKING:
+    # Shared chat engine with memory + doc window
+    from chat_core import OllamaChat
+    from vibe_coding import VibeCodingChat
+    from web_chat import WebChatSession
 
 # -----------------------------
 # Global state 
@@ -69,79 +80,253 @@ os.makedirs(CHAT_DIR, exist_ok=True)
 os.makedirs(IMG_DIR, exist_ok=True)
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
+# Search queries too common to be useful (they'd match nearly every message)
+SEARCH_STOPWORDS = frozenset(
+    {"a", "an", "and", "are", "as", "at", "be", "by", "for", "in", "is", "it",
+     "of", "on", "or", "that", "the", "to", "was", "with"}
+)
+
+# Full-text index over saved chats (backfilled at startup, updated on save)
+_CHAT_INDEX = ChatIndex(os.path.join(CHAT_DIR, "fts.db"))
+
+# Power reports are JSON Lines (one entry per line); convert any legacy array file once
+POWER_REPORTS_PATH = os.path.join(REPORTS_DIR, "power_consumption_reports.jsonl")
+migrate_power_history(
+    os.path.join(REPORTS_DIR, "power_consumption_reports.json"), POWER_REPORTS_PATH
+)
+
 # Power tracking
-_llm_running_flag = {"mode": "None"}  # "Chat" | "Image" | "None"
-_normal_consumption = 0.0
+@dataclass
+class PowerState:
+    """
+    Everything the power thread and the endpoints share. Always read/modify
+    under _state_lock, so read-modify-writes (accumulating, resetting) can't
+    interleave and drop energy.
+    """
+
+    mode: str = "None"  # "Chat" | "Image" | "None"
+    normal_consumption: float = 0.0
+    calculated_accumulator: float = 0.0
+    latest_prompt_Wh: float = 0.0
+    session_total_Wh: float = 0.0
+    # Today's Wh, kept in memory (seeded from the reports file at startup) so
+    # /api/power/* never re-reads the file; today_date marks the day it counts
+    today_total_Wh: float = 0.0
+    today_date: date = field(default_factory=date.today)
+    latest_chat_model: Optional[str] = None
+    latest_image_meta: dict = field(default_factory=lambda: {"date": None, "model": None})
+
+    def reset_session(self) -> None:
+        self.session_total_Wh = 0.0
+        self.latest_prompt_Wh = 0.0
+        self.calculated_accumulator = 0.0
+
+    def summary(self) -> dict:
+        today_total = self.today_total_Wh if self.today_date == date.today() else 0.0
+        return {
+            "latest_prompt_Wh": self.latest_prompt_Wh,
+            "session_total_Wh": self.session_total_Wh,
+            "today_total_Wh": today_total,
+        }
+
+
+_state = PowerState()
+_state_lock = threading.Lock()
 _decay = 0.5
-_latest_prompt_Wh = 0.0
-_session_total_Wh = 0.0
-_calculated_accumulator = 0.0
-_update_period = 0.2  # seconds
-_latest_image_meta = {"date": None, "model": None}
-_latest_chat_model: Optional[str] = None
+_update_period = 0.2  # seconds, while an LLM operation is running
+_idle_sample_period = 5.0  # seconds between idle baseline samples
+# Set while an LLM operation runs; the power thread wakes on it instead of polling
+_sampling_event = threading.Event()
+# Power SSE clients wait on this; notified from any thread via _publish_power()
+_power_changed = asyncio.Condition()
+_event_loop: Optional[asyncio.AbstractEventLoop] = None
+POWER_STREAM_HEARTBEAT = 15.0  # seconds; resend the summary even if unchanged
 _power_thread_started = False
 _power_thread_lock = threading.Lock()
 
+# Installed model names, refreshed at most every MODELS_CACHE_TTL seconds
+MODELS_CACHE_TTL = 10.0
+_MODELS_CACHE = {"t": 0.0, "val": None}
+_MODELS_CACHE_LOCK = threading.Lock()
+
 # Per-model chat engines to preserve memory per model
-_CHAT_ENGINES: dict[str, OllamaChat] = {}
-_CHAT_ENGINES_LOCK = threading.Lock()
+# (each map holds at most ENGINE_CACHE_SIZE models; the least recently used is reset and dropped)
+ENGINE_CACHE_SIZE = 4
+_CHAT_ENGINES = LRUEngines(maxsize=ENGINE_CACHE_SIZE)
 
 # Per-model VibeCoding engines (code assistant)
-_VIBE_ENGINES: dict[str, VibeCodingChat] = {}
-_VIBE_ENGINES_LOCK = threading.Lock()
+_VIBE_ENGINES = LRUEngines(maxsize=ENGINE_CACHE_SIZE)
 
 # Per-model Web chat sessions (tools-enabled web assistant)
-_WEB_SESSIONS: dict[str, WebChatSession] = {}
-_WEB_SESSIONS_LOCK = threading.Lock()
+_WEB_SESSIONS = LRUEngines(maxsize=ENGINE_CACHE_SIZE)
+
+
+def _sse(payload) -> bytes:
+    """Frame one Server-Sent Event; json_utils returns bytes, so no encode step."""
+    return b"data: " + json_utils.dumps(payload) + b"\n\n"
+
+
+# Uploads are copied in chunks of this size without blocking the event loop
+UPLOAD_CHUNK_SIZE = 1 << 20
 
 
-def _get_chat_engine(model: str) -> OllamaChat:
+async def _save_upload(upload: UploadFile, dst: str) -> None:
+    # Staged next to dst and swapped in, so a failed upload never leaves a torn file
+    tmp = tmp_path(dst)
+    try:
+        async with aiofiles.open(tmp, "wb") as out:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                await out.write(chunk)
+        await aiofiles.os.replace(tmp, dst)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _upload_tmpdir(name: str) -> str:
+    """
+    Fresh directory under CHAT_DIR/<name> for one request's uploads, so
+    concurrent requests with same-named files can't overwrite each other.
+    """
+    parent = os.path.join(CHAT_DIR, name)
+    os.makedirs(parent, exist_ok=True)
+    return tempfile.mkdtemp(dir=parent)
+
+
+def _cached_model_names(ttl: float = MODELS_CACHE_TTL) -> dict:
+    """
+    Return installed model names, asking Ollama only when the cached copy is
+    older than `ttl`. If the refresh fails, the stale copy is served instead.
+    """
+    with _MODELS_CACHE_LOCK:
+        if _MODELS_CACHE["val"] is not None and time.time() - _MODELS_CACHE["t"] < ttl:
+            return _MODELS_CACHE["val"]
+        try:
+            names = fetch_model_names()
+        except Exception as e:
+            print(f"Error extracting model names: {e}")
+            return _MODELS_CACHE["val"] if _MODELS_CACHE["val"] is not None else {}
+        _MODELS_CACHE.update(t=time.time(), val=names)
+        return names
+
+
+def _invalidate_model_names():
+    _MODELS_CACHE["t"] = 0.0
+
+
+def _get_chat_engine(model: str) -> "OllamaChat":
     """
     Return an OllamaChat instance for the requested model.
     Each model gets its own conversation history + document context.
     """
-    with _CHAT_ENGINES_LOCK:
-        engine = _CHAT_ENGINES.get(model)
-        if engine is None:
-            engine = OllamaChat(model=model)
-            _CHAT_ENGINES[model] = engine
-        return engine
+    from chat_core import OllamaChat
+
+    return _CHAT_ENGINES.get_or_make(model, lambda: OllamaChat(model=model))
 
-def _get_vibe_engine(model: str) -> VibeCodingChat:
+def _get_vibe_engine(model: str) -> "VibeCodingChat":
     """
     Return a VibeCodingChat instance for the requested model.
     Each model gets its own code context + conversation history.
     """
-    with _VIBE_ENGINES_LOCK:
-        engine = _VIBE_ENGINES.get(model)
-        if engine is None:
-            engine = VibeCodingChat(model=model)
-            _VIBE_ENGINES[model] = engine
-        return engine
+    from vibe_coding import VibeCodingChat
+
+    return _VIBE_ENGINES.get_or_make(model, lambda: VibeCodingChat(model=model))
 
 
-def _get_web_session(model: str) -> WebChatSession:
+def _get_web_session(model: str) -> "WebChatSession":
     """
     Return a WebChatSession instance for the requested model.
     """
-    with _WEB_SESSIONS_LOCK:
-        sess = _WEB_SESSIONS.get(model)
-        if sess is None:
-            sess = WebChatSession(model=model)
-            _WEB_SESSIONS[model] = sess
-        return sess
+    from web_chat import WebChatSession
+
+    return _WEB_SESSIONS.get_or_make(model, lambda: WebChatSession(model=model))
+
+
+def _set_llm_mode(mode: str) -> None:
+    """Mark an LLM operation as running ("Chat" | "Image") or finished ("None")."""
+    with _state_lock:
+        _state.mode = mode
+    if mode == "None":
+        _sampling_event.clear()
+    else:
+        _sampling_event.set()
+
+
+def _add_to_today_total(wh: float) -> None:
+    # Caller holds _state_lock
+    today = date.today()
+    if today != _state.today_date:
+        # Past midnight: yesterday's entries no longer count
+        _state.today_total_Wh, _state.today_date = 0.0, today
+    _state.today_total_Wh += wh
+
+
+@lru_cache(maxsize=4)
+def _power_df_cached(path: str, stamp: tuple):
+    return get_power_usage_history(path)
+
+
+def _power_history():
+    """
+    Parsed power reports, re-read with pandas only when the file changed
+    (keyed on mtime_ns/size). Callers must not mutate the returned frame.
+    """
+    try:
+        st = os.stat(POWER_REPORTS_PATH)
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = (0, 0)
+    return _power_df_cached(POWER_REPORTS_PATH, stamp)
+
+
+def _seed_today_total() -> None:
+    """Sum today's entries from the reports file once at startup."""
+    df = _power_history()
+    today = date.today()
+    total = 0.0
+    if not df.empty:
+        today_rows = df[df["date"].dt.date == today]
+        total = float(today_rows["power"].sum())
+    with _state_lock:
+        _state.today_total_Wh, _state.today_date = total, today
+
+
+async def _notify_power() -> None:
+    async with _power_changed:
+        _power_changed.notify_all()
+
+
+def _publish_power() -> None:
+    """Wake every /api/power/stream client; safe to call from any thread."""
+    if _event_loop is not None and not _event_loop.is_closed():
+        asyncio.run_coroutine_threadsafe(_notify_power(), _event_loop)
+
+
+@contextmanager
+def _llm_session(model: str, mode: str = "Chat"):
+    """
+    Mark an LLM call as running for the power thread, for exactly the
+    duration of the block.
+    """
+    _ensure_power_thread()
+    with _state_lock:
+        _state.latest_chat_model = model
+    _set_llm_mode(mode)
+    try:
+        yield
+    finally:
+        _set_llm_mode("None")
 
 
 def _ensure_power_thread():
     global _power_thread_started
-    if _power_thread_started:
-        return
-    _power_thread_started = True
+    with _power_thread_lock:
+        if _power_thread_started:
+            return
+        _power_thread_started = True
 
     def _runner():
-        global _normal_consumption, _calculated_accumulator
-        global _latest_prompt_Wh, _session_total_Wh
-
         # This call is unused here but kept for parity with previous behavior
         _ = get_default_power_usages()
 
@@ -151,52 +336,105 @@ def _ensure_power_thread():
                 gpu, _ = get_gpu_power_usage()
                 gpu = gpu or 0.0
 
-                if _llm_running_flag["mode"] in ("Chat", "Image"):
-                    _calculated_accumulator += (gpu - _normal_consumption) * _update_period
-                else:
-                    # When an operation ends, compute Wh and persist
-                    if _calculated_accumulator > 0:
-                        _latest_prompt_Wh = _calculated_accumulator / 3600.0
-                        _session_total_Wh += _latest_prompt_Wh
-
-                        entry = {
-                            "date": get_datetime(),
-                            "power": _latest_prompt_Wh,
-                            "model": (
-                                f"{_latest_chat_model}"
-                                if _latest_chat_model
-                                else f"{_latest_image_meta.get('model')}(image_analysis)"
-                            ),
-                        }
-                        path = os.path.join(REPORTS_DIR, "power_consumption_reports.json")
-                        if os.path.exists(path) and os.path.getsize(path) > 0:
-                            try:
-                                with open(path, "r", encoding="utf-8") as f:
-                                    data = json.load(f)
-                            except json.JSONDecodeError:
-                                data = []
-                        else:
-                            data = []
-
-                        data.append(entry)
-                        with open(path, "w", encoding="utf-8") as f:
-                            json.dump(data, f, indent=2)
-
-                        _calculated_accumulator = 0.0
-                        _llm_running_flag["mode"] = "None"
-
-                    _normal_consumption = _normal_consumption * _decay + gpu * (1 - _decay)
+                # Sampling happens outside the lock; only the state update is guarded
+                entry = None
+                with _state_lock:
+                    s = _state
+                    if s.mode in ("Chat", "Image"):
+                        s.calculated_accumulator += (gpu - s.normal_consumption) * _update_period
+                    else:
+                        # When an operation ends, compute Wh and persist
+                        if s.calculated_accumulator > 0:
+                            s.latest_prompt_Wh = s.calculated_accumulator / 3600.0
+                            s.session_total_Wh += s.latest_prompt_Wh
+                            _add_to_today_total(s.latest_prompt_Wh)
+
+                            entry = {
+                                "date": get_datetime(),
+                                "power": s.latest_prompt_Wh,
+                                "model": (
+                                    f"{s.latest_chat_model}"
+                                    if s.latest_chat_model
+                                    else f"{s.latest_image_meta.get('model')}(image_analysis)"
+                                ),
+                            }
+
+                            s.calculated_accumulator = 0.0
+                            s.mode = "None"
+
+                        s.normal_consumption = s.normal_consumption * _decay + gpu * (1 - _decay)
+
+                if entry is not None:
+                    append_power_entry(POWER_REPORTS_PATH, entry)
+                    _publish_power()
             except Exception:
                 # Don't kill the thread; just ignore telemetry errors
                 pass
 
-            time.sleep(_update_period)
+            if _sampling_event.is_set():
+                time.sleep(_update_period)
+            else:
+                # Idle: only refresh the baseline now and then, but wake
+                # immediately when an operation starts
+                _sampling_event.wait(timeout=_idle_sample_period)
 
     t = threading.Thread(target=_runner, daemon=True)
     t.start()
 
 
-app = FastAPI(title="React <> Python API (Ollama)")
+def _prewarm_engines():
+    """
+    Build the engines for each mode's default model so the first prompt doesn't
+    pay for construction. Failures (e.g. a model not pulled yet) are only logged;
+    the engine is then created on first use as before.
+    """
+    config = get_model_config()
+    for getter, mode in (
+        (_get_chat_engine, "chat"),
+        (_get_vibe_engine, "vibe_coding"),
+        (_get_web_session, "web"),
+    ):
+        model = config.get(mode, {}).get("default")
+        if not model:
+            continue
+        try:
+            getter(model)
+        except Exception as e:
+            print(f"Could not prewarm {mode} engine for {model}: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _event_loop
+    # Parse configs/models.json before the first request needs it
+    get_model_config()
+    # Index chats saved before the index existed (or edited on disk)
+    await run_in_threadpool(_CHAT_INDEX.backfill, CHAT_DIR)
+    # Power SSE clients are notified on this loop from worker threads
+    _event_loop = asyncio.get_running_loop()
+    # Seed today's total before the power thread starts adding to it
+    await run_in_threadpool(_seed_today_total)
+    _ensure_power_thread()
+    # In the background, so startup doesn't wait on Ollama
+    threading.Thread(target=_prewarm_engines, daemon=True).start()
+    # One pooled client for direct Ollama HTTP calls (reuses the connection)
+    app.state.ollama = httpx.AsyncClient(base_url="http://localhost:11434", timeout=60.0)
+    try:
+        yield
+    finally:
+        await app.state.ollama.aclose()
+        web_chat = sys.modules.get("web_chat")
+        if web_chat is not None:
+            # Only imported once a web session was made; close its async pools
+            await web_chat.aclose_async_clients()
+
+
+app = FastAPI(
+    title="React <> Python API (Ollama)",
+    lifespan=lifespan,
+    # ORJSONResponse needs orjson at render time; keep the stdlib encoder otherwise
+    default_response_class=ORJSONResponse if json_utils.orjson is not None else JSONResponse,
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -210,13 +448,16 @@ app.add_middleware(
 # -----------------------------
 @app.get("/api/models")
 def list_models():
-    return {"models": list(extract_model_names().keys())}
+    return {"models": list(_cached_model_names().keys())}
 
 
 @app.post("/api/models/pull")
 def pull_model(name: str = Form(...)):
+    import ollama
+
     try:
         ollama.pull(name)
+        _invalidate_model_names()
         return {"ok": True}
     except Exception as e:
         return JSONResponse({"ok": False, "error": str(e)}, status_code=500)
@@ -224,23 +465,29 @@ def pull_model(name: str = Form(...)):
 
 @app.delete("/api/models")
 def delete_models(models: List[str]):
+    import ollama
+
     results = {}
     for m in models:
         try:
             ollama.delete(m)
+            forget_model(m)
             results[m] = "deleted"
             # Also drop any in-memory chat engine for this model
-            with _CHAT_ENGINES_LOCK:
-                _CHAT_ENGINES.pop(m, None)
+            _CHAT_ENGINES.discard(m)
         except Exception as e:
             results[m] = f"error: {e}"
+    _invalidate_model_names()
     return {"results": results}
 
 
 @app.post("/api/models/create")
 def create_model(name: str = Form(...), modelfile: str = Form(...)):
+    import ollama
+
     try:
         ollama.create(model=name, modelfile=modelfile)
+        _invalidate_model_names()
         return {"ok": True}
     except Exception as e:
         return JSONResponse({"ok": False, "error": str(e)}, status_code=500)
@@ -254,7 +501,11 @@ def get_mode_defaults():
     Return backend-defined default model per high-level mode, and whether it is
     currently installed in Ollama. Also includes fast/thinking presets for chat mode.
     """
-    model_names = extract_model_names().keys()  # e.g. {"qwen2.5:7b", ...}
+    from image_v1 import DEFAULT_MODEL as IMAGE_DEFAULT_MODEL
+    from vibe_coding import DEFAULT_MODEL as VIBE_DEFAULT_MODEL
+    from web_chat import DEFAULT_MODEL as WEB_DEFAULT_MODEL
+
+    model_names = _cached_model_names().keys()  # e.g. {"qwen2.5:7b", ...}
     config = get_model_config()
 
     def info(model: str) -> Dict[str, object]:
@@ -287,7 +538,7 @@ def get_mode_defaults():
 # Chat (streaming SSE)
 # -----------------------------
 @app.post("/api/chat")
-def chat(
+async def chat(
     prompt: str = Form(...),
     model: str = Form(...),
     thinking_mode: str = Form("fast"),
@@ -300,55 +551,64 @@ def chat(
 
     # Persist any uploaded files and add them to this model's document context
     context_files: List[str] = []
-    if files:
-        tmpdir = os.path.join(CHAT_DIR, "_tmp")
-        os.makedirs(tmpdir, exist_ok=True)
-        for f in files:
-            dst = os.path.join(tmpdir, f.filename)
-            with open(dst, "wb") as out:
-                shutil.copyfileobj(f.file, out)
-            context_files.append(dst)
+    tmpdir = _upload_tmpdir("_tmp") if files else None
 
-    # Get or create the chat engine for this model
-    engine = _get_chat_engine(model)
+    # Load uploaded docs into the engine's document window; parsing is
+    # CPU/disk bound, so it runs off the event loop
+    def _load_documents(engine):
+        for path in context_files:
+            try:
+                engine.add_document(path)
+            except Exception as e:
+                # Non-fatal: we log, but still attempt to answer the prompt
+                print(f"Error loading document {path}: {e}")
 
-    # Load uploaded docs into the engine's document window
-    for path in context_files:
-        try:
-            engine.add_document(path)
-        except Exception as e:
-            # Non-fatal: we log, but still attempt to answer the prompt
-            print(f"Error loading document {path}: {e}")
+    try:
+        for f in files or []:
+            dst = os.path.join(tmpdir, os.path.basename(f.filename))
+            await _save_upload(f, dst)
+            context_files.append(dst)
 
-    def _gen() -> AsyncGenerator[bytes, None]:
-        global _latest_chat_model, _latest_prompt_Wh
+        # Get or create the chat engine for this model (may verify it with Ollama)
+        engine = await run_in_threadpool(_get_chat_engine, model)
+        await run_in_threadpool(_load_documents, engine)
+    finally:
+        # The engine keeps the extracted text, not the files; also runs when
+        # an upload or engine setup fails, so no directory is left behind
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    async def _gen() -> AsyncGenerator[bytes, None]:
         _ensure_power_thread()
-        _llm_running_flag["mode"] = "Chat"
-        _latest_chat_model = model
+        with _state_lock:
+            _state.latest_chat_model = model
+        _set_llm_mode("Chat")
 
         # Track inference start time
         start_time = time.time()
 
         try:
-            # Stream chunks from the shared chat engine (with memory + docs)
-            for chunk in engine.stream_chat(prompt, thinking_mode=thinking_mode):
-                payload = {"delta": chunk}
-                yield f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+            # Stream chunks from the shared chat engine (with memory + docs);
+            # async, so a long generation doesn't pin a threadpool worker
+            async for chunk in engine.astream_chat(prompt, thinking_mode=thinking_mode):
+                yield _sse({"delta": chunk})
         except Exception as e:
-            yield f"data: {json.dumps({'error': str(e)})}\n\n".encode("utf-8")
+            yield _sse({"error": str(e)})
         finally:
-            _llm_running_flag["mode"] = "None"
+            _set_llm_mode("None")
             # Calculate inference time
             inference_time_ms = int((time.time() - start_time) * 1000)
             # Give power thread a moment to finalize energy calculation
-            time.sleep(0.3)
+            await asyncio.sleep(0.3)
             # Tell the client we're done, include metrics
+            with _state_lock:
+                energy_wh = _state.latest_prompt_Wh
             done_payload = {
                 "done": True,
                 "inference_time_ms": inference_time_ms,
-                "energy_wh": _latest_prompt_Wh,
+                "energy_wh": energy_wh,
             }
-            yield f"data: {json.dumps(done_payload)}\n\n".encode("utf-8")
+            yield _sse(done_payload)
 
     return StreamingResponse(_gen(), media_type="text/event-stream")
 
@@ -358,14 +618,12 @@ def reset_chat(model: str = Form(...)):
     Reset conversation history + loaded documents for the given model,
     and zero out per-session energy counters so the dashboard starts fresh.
     """
-    global _session_total_Wh, _latest_prompt_Wh, _calculated_accumulator
-
     engine = _get_chat_engine(model)
     engine.reset()
 
-    _session_total_Wh = 0.0
-    _latest_prompt_Wh = 0.0
-    _calculated_accumulator = 0.0
+    with _state_lock:
+        _state.reset_session()
+    _publish_power()
 
     return {"ok": True}
 
@@ -373,7 +631,7 @@ def reset_chat(model: str = Form(...)):
 # Vibe coding (non-streaming JSON)
 # -----------------------------
 @app.post("/api/vibe/code")
-def vibe_code(
+async def vibe_code(
     prompt: str = Form(...),
     model: str = Form(...),
     files: Optional[List[UploadFile]] = File(None),
@@ -385,39 +643,40 @@ def vibe_code(
     - Optionally loads uploaded code files into context
     - Returns JSON: { ok: bool, response?: str, error?: str }
     """
-    global _latest_chat_model
-
-    _ensure_power_thread()
-    _llm_running_flag["mode"] = "Chat"
-    _latest_chat_model = model
-
-    engine = _get_vibe_engine(model)
-
     # Save any uploaded code files and load them into the vibe engine
     file_paths: List[str] = []
-    if files:
-        tmpdir = os.path.join(CHAT_DIR, "_vibe")
-        os.makedirs(tmpdir, exist_ok=True)
-        for f in files:
-            dst = os.path.join(tmpdir, f.filename)
-            with open(dst, "wb") as out:
-                shutil.copyfileobj(f.file, out)
-            file_paths.append(dst)
+    tmpdir = _upload_tmpdir("_vibe") if files else None
 
-    for path in file_paths:
-        try:
-            engine.load_code_file(path)
-        except Exception as e:
-            # Non-fatal: still answer the question
-            print(f"Error loading code file {path}: {e}")
+    # Engine setup and the (blocking) LLM call run in the threadpool
+    def _prepare():
+        engine = _get_vibe_engine(model)
+
+        for path in file_paths:
+            try:
+                engine.load_code_file(path)
+            except Exception as e:
+                # Non-fatal: still answer the question
+                print(f"Error loading code file {path}: {e}")
+
+        return engine
 
     try:
-        reply = engine.code(prompt, stream=False)
+        for f in files or []:
+            dst = os.path.join(tmpdir, os.path.basename(f.filename))
+            await _save_upload(f, dst)
+            file_paths.append(dst)
+
+        engine = await run_in_threadpool(_prepare)
+        # Only the generation itself counts towards this prompt's energy
+        with _llm_session(model):
+            reply = await run_in_threadpool(engine.code, prompt, stream=False)
         return {"ok": True, "response": reply}
     except Exception as e:
         return JSONResponse({"ok": False, "error": str(e)}, status_code=500)
     finally:
-        _llm_running_flag["mode"] = "None"
+        # Loaded code lives in the engine's context, not in these files
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
 
 @app.post("/api/vibe/reset")
 def reset_vibe(model: str = Form(...)):
@@ -425,14 +684,12 @@ def reset_vibe(model: str = Form(...)):
     Reset VibeCodingChat state for the given model,
     and reset per-session energy counters.
     """
-    global _session_total_Wh, _latest_prompt_Wh, _calculated_accumulator
-
     engine = _get_vibe_engine(model)
     engine.reset()
 
-    _session_total_Wh = 0.0
-    _latest_prompt_Wh = 0.0
-    _calculated_accumulator = 0.0
+    with _state_lock:
+        _state.reset_session()
+    _publish_power()
 
     return {"ok": True}
 
@@ -440,7 +697,7 @@ def reset_vibe(model: str = Form(...)):
 # Web chat (non-streaming JSON)
 # -----------------------------
 @app.post("/api/web/chat")
-def web_chat_endpoint(
+async def web_chat_endpoint(
     prompt: str = Form(...),
     model: str = Form(...),
 ):
@@ -451,21 +708,16 @@ def web_chat_endpoint(
     - Internally may call Ollama tools web_search / web_fetch
     - Returns JSON: { ok: bool, response?: str, error?: str }
     """
-    global _latest_chat_model
-
-    _ensure_power_thread()
-    _llm_running_flag["mode"] = "Chat"
-    _latest_chat_model = model
-
-    session = _get_web_session(model)
+    session = await run_in_threadpool(_get_web_session, model)
 
     try:
-        reply = session.ask(prompt)
+        # Model and tool round-trips are awaited on the event loop, so other
+        # requests keep being served during a multi-round, tool-calling answer
+        with _llm_session(model):
+            reply = await session.ask_async(prompt)
         return {"ok": True, "response": reply}
     except Exception as e:
         return JSONResponse({"ok": False, "error": str(e)}, status_code=500)
-    finally:
-        _llm_running_flag["mode"] = "None"
 
 
 @app.post("/api/web/reset")
@@ -473,14 +725,12 @@ def reset_web(model: str = Form(...)):
     """
     Reset WebChatSession for the given model and clear session energy.
     """
-    global _session_total_Wh, _latest_prompt_Wh, _calculated_accumulator
-
     session = _get_web_session(model)
     session.reset()
 
-    _session_total_Wh = 0.0
-    _latest_prompt_Wh = 0.0
-    _calculated_accumulator = 0.0
+    with _state_lock:
+        _state.reset_session()
+    _publish_power()
 
     return {"ok": True}
 
@@ -489,31 +739,27 @@ def reset_web(model: str = Form(...)):
 # Image analysis (streaming SSE)
 # -----------------------------
 @app.post("/api/image/analyze")
-def analyze_image(
+async def analyze_image(
     prompt: str = Form(...),
     model: str = Form(...),
     image: UploadFile = File(...),
 ) -> StreamingResponse:
-    # Persist temp image
-    os.makedirs(IMG_DIR, exist_ok=True)
-    path = os.path.join(IMG_DIR, "_tmp_image.png")
-    with open(path, "wb") as out:
-        shutil.copyfileobj(image.file, out)
-
-    # Base64 encode for Ollama multimodal endpoint
+    # Base64 encode for Ollama multimodal endpoint straight from the upload;
+    # the image only reaches disk if the analysis is saved (/api/analyses/save)
     import base64
 
-    with open(path, "rb") as f:
-        b64 = base64.b64encode(f.read()).decode()
+    b64 = base64.b64encode(await image.read()).decode()
 
-    def _gen():
+    async def _gen() -> AsyncGenerator[bytes, None]:
         _ensure_power_thread()
-        _llm_running_flag["mode"] = "Image"
-        _latest_image_meta.update({"date": get_datetime(), "model": model})
+        _set_llm_mode("Image")
+        with _state_lock:
+            _state.latest_image_meta.update({"date": get_datetime(), "model": model})
 
         try:
-            r = requests.post(
-                "http://localhost:11434/api/generate",
+            async with app.state.ollama.stream(
+                "POST",
+                "/api/generate",
                 headers={
                     "Content-Type": "application/json",
                     "Accept": "application/json",
@@ -524,27 +770,23 @@ def analyze_image(
                     "images": [b64],
                     "stream": True,
                 },
-                stream=True,
-                timeout=60,
-            )
-            r.raise_for_status()
-
-            for line in r.iter_lines():
-                if not line:
-                    continue
-                try:
-                    payload = json.loads(line)
-                    if "response" in payload:
-                        yield f"data: {json.dumps({'delta': payload['response']})}\n\n".encode(
-                            "utf-8"
-                        )
-                except json.JSONDecodeError:
-                    continue
+            ) as r:
+                r.raise_for_status()
+
+                async for line in r.aiter_lines():
+                    if not line:
+                        continue
+                    try:
+                        payload = json_utils.loads(line)
+                        if "response" in payload:
+                            yield _sse({"delta": payload["response"]})
+                    except json_utils.JSONDecodeError:
+                        continue
 
         except Exception as e:
-            yield f"data: {json.dumps({'error': str(e)})}\n\n".encode("utf-8")
+            yield _sse({"error": str(e)})
         finally:
-            _llm_running_flag["mode"] = "None"
+            _set_llm_mode("None")
             yield b'data: {"done": true}\n\n'
 
     return StreamingResponse(_gen(), media_type="text/event-stream")
@@ -555,11 +797,9 @@ def analyze_image(
 # -----------------------------
 @app.get("/api/chats")
 def list_chats():
-    items = [
-        d
-        for d in os.listdir(CHAT_DIR)
-        if os.path.isdir(os.path.join(CHAT_DIR, d))
-    ]
+    # scandir's DirEntry.is_dir() reuses the directory read; no stat per entry
+    with os.scandir(CHAT_DIR) as it:
+        items = [e.name for e in it if e.is_dir()]
     return {"chats": items}
 
 
@@ -580,20 +820,24 @@ def save_chat(
     path = os.path.join(CHAT_DIR, name)
     os.makedirs(path, exist_ok=True)
 
-    with open(os.path.join(path, "history.json"), "w", encoding="utf-8") as f:
-        f.write(history_json)
+    # Atomic writes: a concurrent load/search never sees a half-written file
+    history_path = os.path.join(path, "history.json")
+    atomic_write(history_path, history_json)
+
+    try:
+        _CHAT_INDEX.index_chat(name, json.loads(history_json), os.path.getmtime(history_path))
+    except (json.JSONDecodeError, AttributeError, sqlite3.Error) as e:
+        # The chat is saved either way; the startup backfill re-indexes it
+        print(f"Could not index chat {name}: {e}")
 
     if metrics_json:
-        with open(os.path.join(path, "metrics.json"), "w", encoding="utf-8") as f:
-            f.write(metrics_json)
+        atomic_write(os.path.join(path, "metrics.json"), metrics_json)
 
     if session_json:
-        with open(os.path.join(path, "session.json"), "w", encoding="utf-8") as f:
-            f.write(session_json)
+        atomic_write(os.path.join(path, "session.json"), session_json)
 
     if interview_text:
-        with open(os.path.join(path, "interview.txt"), "w", encoding="utf-8") as f:
-            f.write(interview_text)
+        atomic_write(os.path.join(path, "interview.txt"), interview_text)
 
     return {"ok": True}
 
@@ -603,8 +847,7 @@ def load_chat_endpoint(name: str):
     path = os.path.join(CHAT_DIR, name, "history.json")
     if not os.path.exists(path):
         return JSONResponse({"error": "not found"}, status_code=404)
-    with open(path, "r", encoding="utf-8") as f:
-        return JSONResponse(json.load(f))
+    return JSONResponse(_load_history(path))
 
 
 @app.get("/api/chats-search")
@@ -617,45 +860,98 @@ def search_chats(q: str = ""):
         return {"results": []}
 
     query = q.lower()
+    # Queries that would match nearly every message aren't worth a corpus scan
+    if query.strip() in SEARCH_STOPWORDS or (query.isdigit() and len(query) < 3):
+        return {"results": []}
+
+    # Limit to 5 matches per chat and 20 chats, applied inside the index query
+    grouped = _CHAT_INDEX.candidates(query, per_chat=5, max_chats=20)
+    if grouped is None:
+        return {"results": _scan_chats(query)}
+
+    results = [
+        {
+            "chatName": chat_name,
+            "matches": [
+                {"role": role, "snippet": snippet, "index": idx}
+                for idx, role, snippet in rows
+            ],
+        }
+        for chat_name, rows in grouped.items()
+    ]
+    return {"results": results}
+
+
+@lru_cache(maxsize=128)
+def _read_history(path: str, stamp: tuple):
+    with open(path, "rb") as f:
+        return json_utils.loads(f.read())
+
+
+def _load_history(path: str):
+    """
+    Parsed history.json, served from memory while the file is unchanged.
+    Keyed on (mtime_ns, size), so a save naturally busts the cached entry.
+    Callers must treat the result as read-only.
+    """
+    st = os.stat(path)
+    return _read_history(path, (st.st_mtime_ns, st.st_size))
+
+
+def _match_snippet(text: str, query: str) -> Optional[str]:
+    """Snippet of ~50 chars either side of the first match, or None."""
+    if len(text) < len(query):
+        return None
+    pos = text.lower().find(query)
+    if pos < 0:
+        return None
+    start = max(0, pos - 50)
+    end = min(len(text), pos + len(query) + 50)
+    return ("..." if start > 0 else "") + text[start:end] + ("..." if end < len(text) else "")
+
+
+def _scan_chats(query: str) -> list:
+    """
+    Linear search over every history.json; used when the FTS index is unavailable.
+    """
     results = []
 
-    for chat_name in os.listdir(CHAT_DIR):
-        chat_path = os.path.join(CHAT_DIR, chat_name)
-        if not os.path.isdir(chat_path):
-            continue
+    with os.scandir(CHAT_DIR) as it:
+        entries = [e for e in it if e.is_dir()]
 
-        history_path = os.path.join(chat_path, "history.json")
+    for entry in entries:
+        chat_name = entry.name
+        history_path = os.path.join(entry.path, "history.json")
         if not os.path.exists(history_path):
             continue
 
         try:
-            with open(history_path, "r", encoding="utf-8") as f:
-                history = json.load(f)
+            history = _load_history(history_path)
 
             matches = []
             for idx, msg in enumerate(history):
-                text = msg.get("text", "") or msg.get("content", "")
-                if query in text.lower():
-                    # Return a snippet around the match
-                    pos = text.lower().find(query)
-                    start = max(0, pos - 50)
-                    end = min(len(text), pos + len(query) + 50)
-                    snippet = ("..." if start > 0 else "") + text[start:end] + ("..." if end < len(text) else "")
+                # Return a snippet around the match
+                snippet = _match_snippet(message_text(msg), query)
+                if snippet is not None:
                     matches.append({
                         "role": msg.get("role", "unknown"),
                         "snippet": snippet,
                         "index": idx,
                     })
+                    if len(matches) == 5:  # Limit to 5 matches per chat
+                        break
 
             if matches:
                 results.append({
                     "chatName": chat_name,
-                    "matches": matches[:5],  # Limit to 5 matches per chat
+                    "matches": matches,
                 })
+                if len(results) == 20:  # Limit total results
+                    break
         except (json.JSONDecodeError, IOError):
             continue
 
-    return {"results": results[:20]}  # Limit total results
+    return results
 
 
 # -----------------------------
@@ -663,16 +959,13 @@ def search_chats(q: str = ""):
 # -----------------------------
 @app.get("/api/analyses")
 def list_analyses():
-    items = [
-        d
-        for d in os.listdir(IMG_DIR)
-        if os.path.isdir(os.path.join(IMG_DIR, d))
-    ]
+    with os.scandir(IMG_DIR) as it:
+        items = [e.name for e in it if e.is_dir()]
     return {"analyses": items}
 
 
 @app.post("/api/analyses/save")
-def save_analysis(
+async def save_analysis(
     name: str = Form(...),
     history_json: str = Form(...),
     image: UploadFile = File(None),
@@ -680,12 +973,10 @@ def save_analysis(
     path = os.path.join(IMG_DIR, name)
     os.makedirs(path, exist_ok=True)
 
-    with open(os.path.join(path, "history.json"), "w", encoding="utf-8") as f:
-        f.write(history_json)
+    await atomic_write_async(os.path.join(path, "history.json"), history_json)
 
     if image:
-        with open(os.path.join(path, "image.png"), "wb") as out:
-            shutil.copyfileobj(image.file, out)
+        await _save_upload(image, os.path.join(path, "image.png"))
 
     return {"ok": True}
 
@@ -696,8 +987,7 @@ def load_analysis_endpoint(name: str):
     if not os.path.exists(path):
         return JSONResponse({"error": "not found"}, status_code=404)
 
-    with open(path, "r", encoding="utf-8") as f:
-        payload = json.load(f)
+    payload = _load_history(path)
 
     img_path = os.path.join(IMG_DIR, name, "image.png")
     img_exists = os.path.exists(img_path)
@@ -710,29 +1000,26 @@ def load_analysis_endpoint(name: str):
 # -----------------------------
 @app.get("/api/power/summary")
 def power_summary():
-    path = os.path.join(REPORTS_DIR, "power_consumption_reports.json")
-    df = get_power_usage_history(path)
-    today_total = 0.0
-    if not df.empty:
-        today = date.today()
-        today_rows = df[df["date"].dt.date == today]
-        today_total = float(today_rows["power"].sum())
-    return {
-        "latest_prompt_Wh": _latest_prompt_Wh,
-        "session_total_Wh": _session_total_Wh,
-        "today_total_Wh": today_total,
-    }
+    # In-memory counters only; no disk read or pandas per call
+    with _state_lock:
+        return _state.summary()
 
 
 @app.get("/api/power/stream")
-def power_stream():
-    def _gen():
+async def power_stream():
+    async def _gen() -> AsyncGenerator[bytes, None]:
         _ensure_power_thread()
         while True:
             try:
-                summary = power_summary()
-                yield f"data: {json.dumps(summary)}\n\n".encode("utf-8")
-                time.sleep(1.0)
+                yield _sse(power_summary())
+                # Sleep until the power thread (or a reset) publishes a change
+                async with _power_changed:
+                    try:
+                        await asyncio.wait_for(
+                            _power_changed.wait(), timeout=POWER_STREAM_HEARTBEAT
+                        )
+                    except asyncio.TimeoutError:
+                        pass
             except Exception:
                 break
 
@@ -741,8 +1028,7 @@ def power_stream():
 
 @app.get("/api/analytics/power")
 def analytics_power():
-    local_path = os.path.join(REPORTS_DIR, "power_consumption_reports.json")
-    df_local = get_power_usage_history(local_path)
+    df_local = _power_history()
     df_default = get_default_power_usages()
 
     local = df_local.to_dict(orient="records") if not df_local.empty else []
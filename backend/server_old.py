@@ -2,25 +2,34 @@
 import os
 import io
 import json
+import asyncio
 import time
-import shutil
+import hashlib
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
-from typing import List, Optional, AsyncGenerator
+from functools import lru_cache
+from typing import List, Optional, AsyncGenerator, Tuple
 
+import aiofiles
 import fitz  # PyMuPDF
+import httpx
 import ollama
-import requests
 from fastapi import FastAPI, UploadFile, File, Form, Response
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sse_starlette.sse import EventSourceResponse, ServerSentEvent
 from fastapi.middleware.cors import CORSMiddleware
 
 # Utilities migrated from your existing project
-from utilities.ollama_utils import extract_model_names
+from utilities.ollama_utils import extract_model_names, get_async_client
 from utilities.power_usage import (
-    get_cpu_power_usage, get_gpu_power_usage, get_power_usage_history, get_default_power_usages
+    get_cpu_power_usage, get_gpu_power_usage, get_power_usage_history, get_default_power_usages,
+    migrate_power_history,
 )
 from utilities.date_time import get_datetime
+from utilities import json_utils
+from utilities.file_utils import atomic_write_async, tmp_path
 
 # -----------------------------
 # Global state mirroring Gradio
@@ -32,6 +41,12 @@ os.makedirs(CHAT_DIR, exist_ok=True)
 os.makedirs(IMG_DIR, exist_ok=True)
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
+# Append-only JSON Lines log; drains the old JSON-array file on first start
+POWER_REPORTS_PATH = os.path.join(REPORTS_DIR, "power_consumption_reports.jsonl")
+migrate_power_history(
+    os.path.join(REPORTS_DIR, "power_consumption_reports.json"), POWER_REPORTS_PATH
+)
+
 # Power tracking (ported from Gradio_home.py)
 _llm_running_flag = {"mode": "None"}           # "Chat" | "Image" | "None"
 _normal_consumption = 0.0
@@ -42,60 +57,73 @@ _calculated_accumulator = 0.0
 _update_period = 0.2  # seconds
 _latest_image_meta = {"date": None, "model": None}
 _latest_chat_model = None
-_power_thread_started = False
-_power_thread_lock = threading.Lock()
-
-def _ensure_power_thread():
-    global _power_thread_started
-    if _power_thread_started:
-        return
-    _power_thread_started = True
-
-    def _runner():
-        global _normal_consumption, _calculated_accumulator, _latest_prompt_Wh, _session_total_Wh
-        df_default = get_default_power_usages()
-        while True:
-            try:
-                cpu = get_cpu_power_usage()
-                gpu, _ = get_gpu_power_usage()
-                gpu = gpu or 0.0
-
-                if _llm_running_flag["mode"] in ("Chat", "Image"):
-                    _calculated_accumulator += (gpu - _normal_consumption) * _update_period
-                else:
-                    if _calculated_accumulator > 0:
-                        _latest_prompt_Wh = _calculated_accumulator / 3600.0
-                        _session_total_Wh += _latest_prompt_Wh
-                        # Persist to reports
-                        entry = {
-                            "date": get_datetime(),
-                            "power": _latest_prompt_Wh,
-                            "model": f"{_latest_chat_model}" if _llm_running_flag["mode"] == "Chat"
-                                     else f"{_latest_image_meta.get('model')}(image_analysis)"
-                        }
-                        path = os.path.join(REPORTS_DIR, "power_consumption_reports.json")
-                        if os.path.exists(path) and os.path.getsize(path) > 0:
-                            with open(path, "r") as f:
-                                try:
-                                    data = json.load(f)
-                                except json.JSONDecodeError:
-                                    data = []
-                        else:
-                            data = []
-                        data.append(entry)
-                        with open(path, "w") as f:
-                            json.dump(data, f, indent=2)
-                        _calculated_accumulator = 0.0
-                        _llm_running_flag["mode"] = "None"
-
-                    _normal_consumption = _normal_consumption * _decay + gpu * (1 - _decay)
-            except Exception:
-                pass
-            time.sleep(_update_period)
-
-    t = threading.Thread(target=_runner, daemon=True)
-    t.start()
+_today_total_Wh = 0.0
+_today_date = date.today()
+_power_task: Optional[asyncio.Task] = None
+
+def _add_to_today_total(wh: float) -> None:
+    global _today_total_Wh, _today_date
+    today = date.today()
+    if today != _today_date:
+        # Past midnight: yesterday's entries no longer count
+        _today_total_Wh, _today_date = 0.0, today
+    _today_total_Wh += wh
+
+def _seed_today_total() -> None:
+    """Sum today's entries from the reports file once, at startup."""
+    global _today_total_Wh, _today_date
+    df = get_power_usage_history(POWER_REPORTS_PATH)
+    today = date.today()
+    total = 0.0
+    if not df.empty:
+        today_rows = df[df["date"].dt.date == today]
+        total = float(today_rows["power"].sum())
+    _today_total_Wh, _today_date = total, today
 
+async def _power_loop():
+    """
+    Power polling, run as a task on the event loop so the globals above are
+    only ever touched from one thread; the NVML read goes to a worker thread.
+    """
+    global _normal_consumption, _calculated_accumulator, _latest_prompt_Wh, _session_total_Wh
+    while True:
+        try:
+            cpu = get_cpu_power_usage()
+            gpu, _ = await asyncio.to_thread(get_gpu_power_usage)
+            gpu = gpu or 0.0
+
+            if _llm_running_flag["mode"] in ("Chat", "Image"):
+                _calculated_accumulator += (gpu - _normal_consumption) * _update_period
+            else:
+                if _calculated_accumulator > 0:
+                    _latest_prompt_Wh = _calculated_accumulator / 3600.0
+                    _session_total_Wh += _latest_prompt_Wh
+                    _add_to_today_total(_latest_prompt_Wh)
+                    # Persist to reports
+                    entry = {
+                        "date": get_datetime(),
+                        "power": _latest_prompt_Wh,
+                        "model": f"{_latest_chat_model}" if _llm_running_flag["mode"] == "Chat"
+                                 else f"{_latest_image_meta.get('model')}(image_analysis)"
+                    }
+                    _calculated_accumulator = 0.0
+                    _llm_running_flag["mode"] = "None"
+                    async with aiofiles.open(POWER_REPORTS_PATH, "ab") as f:
+                        await f.write(json_utils.dumps(entry) + b"\n")
+
+                _normal_consumption = _normal_consumption * _decay + gpu * (1 - _decay)
+        except Exception:
+            pass
+        await asyncio.sleep(_update_period)
+
+
+# Pooled keep-alive connection to the local Ollama HTTP API (image analysis);
+# no read timeout, since a vision model may think for a while between lines
+_OLLAMA_HTTP = httpx.AsyncClient(
+    base_url="http://localhost:11434",
+    timeout=httpx.Timeout(60.0, read=None),
+    limits=httpx.Limits(max_keepalive_connections=8),
+)
 
 app = FastAPI(title="React <> Python API (Ollama)")
 app.add_middleware(
@@ -106,15 +134,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def _start_power_loop():
+    global _power_task
+    await asyncio.to_thread(_seed_today_total)
+    _power_task = asyncio.create_task(_power_loop())
+
+@app.on_event("shutdown")
+async def _shutdown():
+    if _power_task is not None:
+        _power_task.cancel()
+    await _OLLAMA_HTTP.aclose()
+    _PDF_POOL.shutdown(wait=False)
+
 # ------------- Helpers -------------
-def _extract_text_from_pdf(path: str) -> str:
+# EventSourceResponse does the "data: ...\n\n" framing and sends keep-alive
+# comments; "\n" separators because the frontend splits events on "\n\n"
+# (events carry their own separator, so _sse() must pass it too)
+SSE_PING_SECONDS = 15
+SSE_SEP = "\n"
+
+
+def _sse(obj: dict) -> ServerSentEvent:
+    return ServerSentEvent(data=json_utils.dumps(obj).decode("utf-8"), sep=SSE_SEP)
+
+
+# Pre-encoded end-of-stream event; EventSourceResponse sends bytes as-is
+_SSE_DONE = _sse({"done": True}).encode()
+
+
+def _sse_response(gen) -> EventSourceResponse:
+    return EventSourceResponse(gen, ping=SSE_PING_SECONDS, sep=SSE_SEP)
+
+def _file_digest(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+# Minimal flag set for LLM context: keep clipping to the page, but skip
+# ligature/whitespace preservation (ligatures come out as plain letters)
+_PDF_TEXT_FLAGS = fitz.TEXT_MEDIABOX_CLIP
+
+@lru_cache(maxsize=64)
+def _pdf_text(digest: str, path: str) -> str:
+    # Keyed on the content digest, so a re-uploaded PDF skips extraction
+    with fitz.open(path) as pdf:
+        # Plain "text" mode without reading-order sort is PyMuPDF's fastest path
+        parts = [page.get_text("text", sort=False, flags=_PDF_TEXT_FLAGS) for page in pdf]
+    return "".join(parts)
+
+def _extract_text_from_pdf(path: str, digest: Optional[str] = None) -> str:
     try:
-        text = ""
-        pdf = fitz.open(path)
-        for i in range(len(pdf)):
-            text += pdf[i].get_text()
-        pdf.close()
-        return text
+        return _pdf_text(digest or _file_digest(path), path)
     except Exception:
         return ""
 
@@ -125,30 +198,84 @@ def _extract_text_from_txt(path: str) -> str:
     except Exception:
         return ""
 
-def _aggregate_context_from_files(files: List[str]) -> str:
+# PyMuPDF releases the GIL while extracting, so threads are enough to run
+# several uploaded documents in parallel
+_PDF_POOL = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1))
+
+def _extract_text(path: str, name: str, digest: Optional[str] = None) -> str:
+    base = name.lower()
+    if base.endswith(".pdf"):
+        return _extract_text_from_pdf(path, digest)
+    if base.endswith(".txt"):
+        return _extract_text_from_txt(path)
+    return ""
+
+def _save_upload(upload: UploadFile, tmpdir: str) -> Tuple[str, str]:
+    """
+    Copy an upload into `tmpdir`, hashing it on the way, and store it under
+    its digest; identical re-uploads reuse the existing file.
+    Returns (path, digest).
+    """
+    h = hashlib.blake2b(digest_size=16)
+    staging = tmp_path(os.path.join(tmpdir, "upload"))
+    try:
+        with open(staging, "wb") as out:
+            while chunk := upload.file.read(1 << 16):
+                h.update(chunk)
+                out.write(chunk)
+        digest = h.hexdigest()
+        dst = os.path.join(tmpdir, digest + os.path.splitext(upload.filename)[1].lower())
+        if os.path.exists(dst):
+            os.remove(staging)
+        else:
+            os.replace(staging, dst)
+    except BaseException:
+        if os.path.exists(staging):
+            os.remove(staging)
+        raise
+    return dst, digest
+
+async def _aggregate_context_from_files(files: List[Tuple[str, str, Optional[str]]]) -> str:
+    """`files` holds (path, display name, content digest or None) per document."""
     if not files:
         return ""
+    loop = asyncio.get_running_loop()
+    contents = await asyncio.gather(
+        *[loop.run_in_executor(_PDF_POOL, _extract_text, *f) for f in files]
+    )
     out = "I'm providing you with the following documents for context:\n\n"
-    for f in files:
-        base = os.path.basename(f)
-        content = ""
-        if base.lower().endswith(".pdf"):
-            content = _extract_text_from_pdf(f)
-        elif base.lower().endswith(".txt"):
-            content = _extract_text_from_txt(f)
+    for (_, name, _), content in zip(files, contents):
         if content:
-            out += f"--- Document: {base} ---\n{content}\n\n"
+            out += f"--- Document: {name} ---\n{content}\n\n"
     return out
 
 # ------------- Models -------------
+# The frontend polls /api/models; keep Ollama's answer for a couple of seconds
+MODELS_CACHE_TTL = 2.0
+_MODELS_CACHE = {"t": 0.0, "val": None}
+_MODELS_CACHE_LOCK = threading.Lock()
+
+def _cached_model_names() -> dict:
+    with _MODELS_CACHE_LOCK:
+        if _MODELS_CACHE["val"] is not None and time.monotonic() - _MODELS_CACHE["t"] < MODELS_CACHE_TTL:
+            return _MODELS_CACHE["val"]
+        names = extract_model_names()
+        _MODELS_CACHE.update(t=time.monotonic(), val=names)
+        return names
+
+def _invalidate_model_names():
+    with _MODELS_CACHE_LOCK:
+        _MODELS_CACHE["val"] = None
+
 @app.get("/api/models")
 def list_models():
-    return {"models": list(extract_model_names().keys())}
+    return {"models": list(_cached_model_names().keys())}
 
 @app.post("/api/models/pull")
 def pull_model(name: str = Form(...)):
     try:
         ollama.pull(name)
+        _invalidate_model_names()
         return {"ok": True}
     except Exception as e:
         return JSONResponse({"ok": False, "error": str(e)}, status_code=500)
@@ -162,107 +289,105 @@ def delete_models(models: List[str]):
             results[m] = "deleted"
         except Exception as e:
             results[m] = f"error: {e}"
+    _invalidate_model_names()
     return {"results": results}
 
 @app.post("/api/models/create")
 def create_model(name: str = Form(...), modelfile: str = Form(...)):
     try:
         ollama.create(model=name, modelfile=modelfile)
+        _invalidate_model_names()
         return {"ok": True}
     except Exception as e:
         return JSONResponse({"ok": False, "error": str(e)}, status_code=500)
 
 # ------------- Chat (streaming) -------------
 @app.post("/api/chat")
-def chat(prompt: str = Form(...),
-         model: str = Form(...),
-         files: Optional[List[UploadFile]] = File(None)) -> StreamingResponse:
+async def chat(prompt: str = Form(...),
+               model: str = Form(...),
+               files: Optional[List[UploadFile]] = File(None)) -> EventSourceResponse:
     """
     Streams text chunks as Server-Sent Events (text/event-stream).
     """
-    # Build messages
-    context_files = []
-    if files:
-        tmpdir = os.path.join(CHAT_DIR, "_tmp")
-        os.makedirs(tmpdir, exist_ok=True)
-        for f in files:
-            dst = os.path.join(tmpdir, f.filename)
-            with open(dst, "wb") as out:
-                shutil.copyfileobj(f.file, out)
-            context_files.append(dst)
-
-    system_ctx = _aggregate_context_from_files(context_files)
+    # File copies block, so off the event loop
+    def _save_uploads() -> List[Tuple[str, str, Optional[str]]]:
+        context_files = []
+        if files:
+            tmpdir = os.path.join(CHAT_DIR, "_tmp")
+            os.makedirs(tmpdir, exist_ok=True)
+            for f in files:
+                dst, digest = _save_upload(f, tmpdir)
+                context_files.append((dst, f.filename, digest))
+        return context_files
+
+    context_files = await run_in_threadpool(_save_uploads)
+    system_ctx = await _aggregate_context_from_files(context_files)
     messages = []
     if system_ctx:
         messages.append({"role": "system", "content": system_ctx})
     messages.append({"role": "user", "content": prompt})
 
-    def _gen() -> AsyncGenerator[bytes, None]:
+    # Async generator: the response iterates it on the event loop
+    # instead of handing every chunk through the threadpool
+    async def _gen() -> AsyncGenerator[ServerSentEvent, None]:
         global _latest_chat_model
-        _ensure_power_thread()
         _llm_running_flag["mode"] = "Chat"
         _latest_chat_model = model
         try:
-            stream = ollama.chat(model=model, messages=messages, stream=True)
-            for chunk in stream:
+            stream = await get_async_client().chat(model=model, messages=messages, stream=True)
+            async for chunk in stream:
                 content = chunk.get("message", {}).get("content", "")
                 if content:
-                    yield f"data: {json.dumps({'delta': content})}\n\n".encode("utf-8")
+                    yield _sse({"delta": content})
         except Exception as e:
-            yield f"data: {json.dumps({'error': str(e)})}\n\n".encode("utf-8")
+            yield _sse({"error": str(e)})
         finally:
             # Turn flag off; power thread will compute Wh and persist
             _llm_running_flag["mode"] = "None"
-            yield b"data: {\"done\": true}\n\n"
+            yield _SSE_DONE
 
-    return StreamingResponse(_gen(), media_type="text/event-stream")
+    return _sse_response(_gen())
 
 # ------------- Image analysis (streaming) -------------
 @app.post("/api/image/analyze")
-def analyze_image(prompt: str = Form(...),
-                  model: str = Form(...),
-                  image: UploadFile = File(...)) -> StreamingResponse:
-    # Persist image temporarily
-    os.makedirs(IMG_DIR, exist_ok=True)
-    path = os.path.join(IMG_DIR, "_tmp_image.png")
-    with open(path, "wb") as out:
-        shutil.copyfileobj(image.file, out)
-
-    # Prepare base64
+async def analyze_image(prompt: str = Form(...),
+                        model: str = Form(...),
+                        image: UploadFile = File(...)) -> EventSourceResponse:
     import base64
-    with open(path, "rb") as f:
-        b64 = base64.b64encode(f.read()).decode()
 
-    def _gen():
-        _ensure_power_thread()
+    # Encode straight from the upload; /api/analyses/save receives its own
+    # copy of the image, so nothing needs to hit the disk here
+    data = await image.read()
+    b64 = base64.b64encode(data).decode()
+
+    async def _gen() -> AsyncGenerator[ServerSentEvent, None]:
         _llm_running_flag["mode"] = "Image"
         _latest_image_meta.update({"date": get_datetime(), "model": model})
         try:
             # Using Ollama HTTP endpoint for multi-modal just like Gradio_image_analysis.py
-            r = requests.post(
-                "http://localhost:11434/api/generate",
+            async with _OLLAMA_HTTP.stream(
+                "POST",
+                "/api/generate",
                 headers={"Content-Type": "application/json", "Accept": "application/json"},
                 json={"model": model, "prompt": prompt, "images": [b64], "stream": True},
-                stream=True,
-                timeout=60,
-            )
-            r.raise_for_status()
-            for line in r.iter_lines():
-                if not line:
-                    continue
-                try:
-                    payload = json.loads(line)
-                    if "response" in payload:
-                        yield f"data: {json.dumps({'delta': payload['response']})}\n\n".encode("utf-8")
-                except json.JSONDecodeError:
-                    continue
+            ) as r:
+                r.raise_for_status()
+                async for line in r.aiter_lines():
+                    if not line:
+                        continue
+                    try:
+                        payload = json_utils.loads(line)
+                        if "response" in payload:
+                            yield _sse({"delta": payload["response"]})
+                    except json_utils.JSONDecodeError:
+                        continue
         except Exception as e:
-            yield f"data: {json.dumps({'error': str(e)})}\n\n".encode("utf-8")
+            yield _sse({"error": str(e)})
         finally:
             _llm_running_flag["mode"] = "None"
-            yield b"data: {\"done\": true}\n\n"
+            yield _SSE_DONE
 
-    return StreamingResponse(_gen(), media_type="text/event-stream")
+    return _sse_response(_gen())
 
 # ------------- Save / Load chat -------------
 @app.get("/api/chats")
@@ -271,7 +396,7 @@ def list_chats():
     return {"chats": items}
 
 @app.post("/api/chats/save")
-def save_chat(
+async def save_chat(
     name: str = Form(...),
     history_json: str = Form(...),
     # NEW (optional) fields:
@@ -282,30 +407,28 @@ def save_chat(
     path = os.path.join(CHAT_DIR, name)
     os.makedirs(path, exist_ok=True)
 
-    with open(os.path.join(path, "history.json"), "w", encoding="utf-8") as f:
-        f.write(history_json)
+    # aiofiles writes (via atomic temp-file + replace) keep the event loop serving
+    await atomic_write_async(os.path.join(path, "history.json"), history_json)
 
     if metrics_json:
-        with open(os.path.join(path, "metrics.json"), "w", encoding="utf-8") as f:
-            f.write(metrics_json)
+        await atomic_write_async(os.path.join(path, "metrics.json"), metrics_json)
 
     if session_json:
-        with open(os.path.join(path, "session.json"), "w", encoding="utf-8") as f:
-            f.write(session_json)
+        await atomic_write_async(os.path.join(path, "session.json"), session_json)
 
     if interview_text:
-        with open(os.path.join(path, "interview.txt"), "w", encoding="utf-8") as f:
-            f.write(interview_text)
+        await atomic_write_async(os.path.join(path, "interview.txt"), interview_text)
 
     return {"ok": True}
 
 @app.get("/api/chats/{name}")
 def load_chat_endpoint(name: str):
     path = os.path.join(CHAT_DIR, name, "history.json")
-    if not os.path.exists(path):
+    try:
+        with open(path, "r") as f:
+            return JSONResponse(json.load(f))
+    except FileNotFoundError:
         return JSONResponse({"error": "not found"}, status_code=404)
-    with open(path, "r") as f:
-        return JSONResponse(json.load(f))
 
 # ------------- Save / Load image analyses -------------
 @app.get("/api/analyses")
@@ -314,23 +437,22 @@ def list_analyses():
     return {"analyses": items}
 
 @app.post("/api/analyses/save")
-def save_analysis(name: str = Form(...), history_json: str = Form(...), image: UploadFile = File(None)):
+async def save_analysis(name: str = Form(...), history_json: str = Form(...), image: UploadFile = File(None)):
     path = os.path.join(IMG_DIR, name)
     os.makedirs(path, exist_ok=True)
-    with open(os.path.join(path, "history.json"), "w") as f:
-        f.write(history_json)
+    await atomic_write_async(os.path.join(path, "history.json"), history_json)
     if image:
-        with open(os.path.join(path, "image.png"), "wb") as out:
-            shutil.copyfileobj(image.file, out)
+        await atomic_write_async(os.path.join(path, "image.png"), await image.read())
     return {"ok": True}
 
 @app.get("/api/analyses/{name}")
 def load_analysis_endpoint(name: str):
     path = os.path.join(IMG_DIR, name, "history.json")
-    if not os.path.exists(path):
+    try:
+        with open(path, "r") as f:
+            payload = json.load(f)
+    except FileNotFoundError:
         return JSONResponse({"error": "not found"}, status_code=404)
-    with open(path, "r") as f:
-        payload = json.load(f)
     img_path = os.path.join(IMG_DIR, name, "image.png")
     img_exists = os.path.exists(img_path)
     return {"history": payload, "has_image": img_exists}
@@ -338,44 +460,49 @@ def load_analysis_endpoint(name: str):
 # ------------- Power endpoints -------------
 @app.get("/api/power/summary")
 def power_summary():
-    path = os.path.join(REPORTS_DIR, "power_consumption_reports.json")
-    df = get_power_usage_history(path)
-    today_total = 0.0
-    if not df.empty:
-        today = date.today()
-        today_rows = df[df["date"].dt.date == today]
-        today_total = float(today_rows["power"].sum())
+    # Running totals kept by _power_loop; no report file parsing per call
     return {
         "latest_prompt_Wh": _latest_prompt_Wh,
         "session_total_Wh": _session_total_Wh,
-        "today_total_Wh": today_total,
+        "today_total_Wh": _today_total_Wh if _today_date == date.today() else 0.0,
     }
 
+# Reused by /api/power/stream instead of building a new dict every tick
+_SUMMARY = {"latest_prompt_Wh": 0.0, "session_total_Wh": 0.0, "today_total_Wh": 0.0}
+
+def _summary_view() -> dict:
+    _SUMMARY["latest_prompt_Wh"] = _latest_prompt_Wh
+    _SUMMARY["session_total_Wh"] = _session_total_Wh
+    _SUMMARY["today_total_Wh"] = _today_total_Wh if _today_date == date.today() else 0.0
+    return _SUMMARY
+
 @app.get("/api/power/stream")
 def power_stream():
     def _gen():
-        _ensure_power_thread()
         while True:
             try:
-                summary = power_summary()
-                yield f"data: {json.dumps(summary)}\n\n".encode("utf-8")
+                yield _sse(_summary_view())
                 time.sleep(1.0)
             except Exception:
                 break
-    return StreamingResponse(_gen(), media_type="text/event-stream")
+    return _sse_response(_gen())
 
 @app.get("/api/analytics/power")
 def analytics_power():
-    local_path = os.path.join(REPORTS_DIR, "power_consumption_reports.json")
-    df_local = get_power_usage_history(local_path)
+    df_local = get_power_usage_history(POWER_REPORTS_PATH)
     df_default = get_default_power_usages()
-    local = []
+    # pandas serializes the tables in C; splice them into one body instead of
+    # building per-row dicts for FastAPI to encode again
+    local = "[]"
     if not df_local.empty:
-        local = df_local.to_dict(orient="records")
-    default = []
+        local = df_local.to_json(orient="records", date_format="iso")
+    default = "[]"
     if df_default is not None and not df_default.empty:
-        default = df_default.to_dict(orient="records")
-    return {"local": local, "default": default}
+        default = df_default.to_json(orient="records", date_format="iso")
+    return Response(
+        content=f'{{"local":{local},"default":{default}}}',
+        media_type="application/json",
+    )
 
 # Health
 @app.get("/api/health")
@@ -0,0 +1,14 @@
+from chat_core import TXT_SNIFF_BYTES, OllamaChat
+
+
+def test_load_txt_utf8_char_across_sniff_boundary(tmp_path):
+    # "é" is two bytes in UTF-8; pad so it straddles the sniffed prefix's end
+    head = "a" * (TXT_SNIFF_BYTES - 1)
+    text = head + "é" + " Le café est très bon. " * 100
+    assert text.encode("utf-8")[TXT_SNIFF_BYTES - 1:TXT_SNIFF_BYTES + 1] == "é".encode("utf-8")
+
+    path = tmp_path / "large.txt"
+    path.write_bytes(text.encode("utf-8"))
+
+    # load_txt doesn't touch instance state, so no model/daemon is needed
+    assert OllamaChat.load_txt(None, str(path)) == text
@@ -0,0 +1,167 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+
+# Characters of context kept either side of a match in search snippets
+SNIPPET_CONTEXT = 50
+
+
+def message_text(msg: dict) -> str:
+    return msg.get("text", "") or msg.get("content", "")
+
+
+def _match_pos(text: Optional[str], query: str) -> int:
+    """1-based position of `query` (already lowercased) in `text`, 0 if absent."""
+    return (text or "").lower().find(query) + 1
+
+
+class ChatIndex:
+    """
+    SQLite FTS5 index over saved chat messages, so /api/chats-search no longer
+    re-reads every history.json per query.
+
+    Uses the trigram tokenizer, which matches arbitrary substrings (like the
+    original `query in text.lower()` scan) for queries of 3+ characters.
+    If this SQLite build lacks FTS5/trigram, `available` is False and callers
+    should fall back to scanning the files.
+    """
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        # Python's lower() rather than SQLite's ASCII-only one, so positions
+        # agree with the file-scan fallback
+        self._conn.create_function("match_pos", 2, _match_pos, deterministic=True)
+        try:
+            self._conn.executescript(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS chat_fts USING fts5(
+                    chat_name UNINDEXED, role UNINDEXED, idx UNINDEXED, text,
+                    tokenize = 'trigram'
+                );
+                CREATE TABLE IF NOT EXISTS chat_meta (
+                    chat_name TEXT PRIMARY KEY, mtime REAL NOT NULL
+                );
+                """
+            )
+            self.available = True
+        except sqlite3.OperationalError as e:
+            print(f"Warning: chat search index disabled ({e})")
+            self.available = False
+
+    def index_chat(self, chat_name: str, history: List[dict], mtime: float) -> None:
+        """Replace all indexed rows for one chat."""
+        if not self.available:
+            return
+        rows = [
+            (chat_name, msg.get("role", "unknown"), idx, message_text(msg))
+            for idx, msg in enumerate(history)
+        ]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chat_fts WHERE chat_name = ?", (chat_name,))
+            self._conn.executemany(
+                "INSERT INTO chat_fts (chat_name, role, idx, text) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_meta (chat_name, mtime) VALUES (?, ?)",
+                (chat_name, mtime),
+            )
+
+    def backfill(self, chat_dir: str) -> None:
+        """
+        Index chats whose history.json changed since it was last indexed
+        (or was never indexed), and drop chats that no longer exist.
+        """
+        if not self.available:
+            return
+        with self._lock:
+            known = dict(self._conn.execute("SELECT chat_name, mtime FROM chat_meta"))
+
+        present = set()
+        with os.scandir(chat_dir) as it:
+            for entry in it:
+                if not entry.is_dir():
+                    continue
+                history_path = os.path.join(entry.path, "history.json")
+                try:
+                    mtime = os.path.getmtime(history_path)
+                except OSError:
+                    continue
+                present.add(entry.name)
+                if known.get(entry.name) == mtime:
+                    continue
+                try:
+                    with open(history_path, "r", encoding="utf-8") as f:
+                        history = json.load(f)
+                except (json.JSONDecodeError, IOError):
+                    continue
+                self.index_chat(entry.name, history, mtime)
+
+        stale = [(name,) for name in known if name not in present]
+        if stale:
+            with self._lock, self._conn:
+                self._conn.executemany("DELETE FROM chat_fts WHERE chat_name = ?", stale)
+                self._conn.executemany("DELETE FROM chat_meta WHERE chat_name = ?", stale)
+
+    def candidates(
+        self, query: str, per_chat: int = 5, max_chats: int = 20
+    ) -> Optional[Dict[str, List[tuple]]]:
+        """
+        Return {chat_name: [(idx, role, snippet), ...]} for messages containing
+        `query` (lowercase), in chat/message order; None if the index is unavailable.
+
+        Snippets (SNIPPET_CONTEXT chars either side of the first match) are cut
+        in SQL, and at most `per_chat` messages from the first `max_chats` chats
+        are returned, so full message texts never leave SQLite.
+        """
+        if not self.available:
+            return None
+        if len(query) >= 3:
+            # Quoted phrase: trigram MATCH is a case-insensitive substring test
+            sql = "WHERE text MATCH :arg"
+            arg = '"' + query.replace('"', '""') + '"'
+        else:
+            # Too short for trigrams; LIKE still avoids re-parsing every file
+            sql = "WHERE text LIKE :arg ESCAPE '\\'"
+            arg = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+        params = {
+            "arg": arg,
+            "query": query,
+            "qlen": len(query),
+            "ctx": SNIPPET_CONTEXT,
+            "per_chat": per_chat,
+            "max_chats": max_chats,
+            "limit": per_chat * max_chats,
+        }
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT chat_name, idx, role, snippet FROM (
+                    SELECT chat_name, idx, role,
+                        CASE WHEN pos > :ctx + 1 THEN '...' ELSE '' END
+                        || substr(text, max(1, pos - :ctx), :qlen + :ctx + min(pos - 1, :ctx))
+                        || CASE WHEN pos - 1 + :qlen + :ctx < length(text) THEN '...' ELSE '' END
+                            AS snippet,
+                        ROW_NUMBER() OVER (PARTITION BY chat_name ORDER BY idx) AS msg_rank,
+                        DENSE_RANK() OVER (ORDER BY chat_name) AS chat_rank
+                    FROM (
+                        SELECT chat_name, idx, role, text, match_pos(text, :query) AS pos
+                        FROM chat_fts {sql}
+                    )
+                    WHERE pos > 0
+                )
+                WHERE msg_rank <= :per_chat AND chat_rank <= :max_chats
+                ORDER BY chat_name, idx
+                LIMIT :limit
+                """,
+                params,
+            ).fetchall()
+
+        grouped: Dict[str, List[tuple]] = {}
+        for chat_name, idx, role, snippet in rows:
+            grouped.setdefault(chat_name, []).append((idx, role, snippet))
+        return grouped
@@ -0,0 +1,71 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+class LRUEngines(OrderedDict):
+    """
+    Size-bounded, thread-safe map of per-model engines/sessions.
+
+    The least recently used entry is evicted once more than `maxsize` models
+    are held; its reset() (if any) is called so conversation state and
+    document windows are released even if something still references it.
+
+    The map lock is only held for lookups and inserts. Construction runs
+    under a per-key lock, so building model A never blocks a request for B.
+    """
+
+    def __init__(self, maxsize: int = 4):
+        super().__init__()
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+
+    def _lookup(self, key: Hashable) -> Any:
+        # Caller holds self._lock
+        if key in self:
+            self.move_to_end(key)
+            return self[key]
+        return None
+
+    def get_or_make(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                return value
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Double-check: another caller may have built it while we waited
+            with self._lock:
+                value = self._lookup(key)
+            if value is not None:
+                return value
+
+            try:
+                value = factory()
+            except BaseException:
+                with self._lock:
+                    self._key_locks.pop(key, None)
+                raise
+
+            # Publish and retire the key lock together, so no caller can miss both
+            with self._lock:
+                self[key] = value
+                self._key_locks.pop(key, None)
+                evicted = []
+                while len(self) > self.maxsize:
+                    evicted.append(self.popitem(last=False)[1])
+
+        for old in evicted:
+            reset = getattr(old, "reset", None)
+            if callable(reset):
+                try:
+                    reset()
+                except Exception as e:
+                    print(f"Error resetting evicted engine: {e}")
+        return value
+
+    def discard(self, key: Hashable) -> Any:
+        with self._lock:
+            return self.pop(key, None)
@@ -0,0 +1,54 @@
+import os
+import uuid
+from typing import Union
+
+import aiofiles
+import aiofiles.os
+
+
+def stat_nonempty(path: str) -> bool:
+    """True if `path` exists and is non-empty, using a single stat() call."""
+    try:
+        return os.stat(path).st_size > 0
+    except OSError:
+        return False
+
+
+def tmp_path(path: str) -> str:
+    """Unique sibling path to stage a write to `path` (same filesystem, so os.replace is atomic)."""
+    return f"{path}.{uuid.uuid4().hex}.tmp"
+
+
+def _open_args(data: Union[str, bytes]) -> dict:
+    if isinstance(data, bytes):
+        return {"mode": "wb"}
+    return {"mode": "w", "encoding": "utf-8"}
+
+
+def atomic_write(path: str, data: Union[str, bytes]) -> None:
+    """
+    Write `data` to `path` through a temp file and os.replace(), so readers
+    see either the old or the new contents, never a partially written file.
+    """
+    tmp = tmp_path(path)
+    try:
+        with open(tmp, **_open_args(data)) as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+async def atomic_write_async(path: str, data: Union[str, bytes]) -> None:
+    """atomic_write() for async endpoints, using aiofiles."""
+    tmp = tmp_path(path)
+    try:
+        async with aiofiles.open(tmp, **_open_args(data)) as f:
+            await f.write(data)
+        await aiofiles.os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
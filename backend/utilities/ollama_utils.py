@@ -1,15 +1,76 @@
-import ollama
+from __future__ import annotations
+
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import ollama
+
+# Models already confirmed present via ollama.show(); shared across sessions
+_VERIFIED_MODELS: set[str] = set()
+_VERIFIED_MODELS_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def get_client() -> ollama.Client:
+    """
+    Process-wide Ollama client. Sharing one instance keeps its HTTP
+    connection pool (and keep-alive connections) warm across sessions.
+    """
+    import ollama
+
+    return ollama.Client()
+
+
+@lru_cache(maxsize=1)
+def get_async_client() -> ollama.AsyncClient:
+    """
+    Process-wide async Ollama client, for streaming from an event loop.
+    """
+    import ollama
+
+    return ollama.AsyncClient()
+
+
+def fetch_model_names() -> dict:
+    """
+    Like extract_model_names(), but lets errors from the daemon propagate.
+    """
+    models_info = get_client().list()
+    if hasattr(models_info, "models"):
+        model_names = {model.model: model.model for model in models_info.models}
+    elif isinstance(models_info, list):
+        model_names = {model.get("model"): model.get("model") for model in models_info if model.get("model")}
+    else:
+        model_names = {}
+    return model_names
+
 
 def extract_model_names() -> dict:
     try:
-        models_info = ollama.list()
-        if hasattr(models_info, "models"):
-            model_names = {model.model: model.model for model in models_info.models}
-        elif isinstance(models_info, list):
-            model_names = {model.get("model"): model.get("model") for model in models_info if model.get("model")}
-        else:
-            model_names = {}
-        return model_names
+        return fetch_model_names()
     except Exception as e:
         print(f"Error extracting model names: {e}")
         return {}
+
+
+def verify_model(model: str) -> None:
+    """
+    Raise if `model` is not available in the local Ollama daemon.
+    Successful checks are remembered, so each model costs one RPC per process.
+    """
+    with _VERIFIED_MODELS_LOCK:
+        if model in _VERIFIED_MODELS:
+            return
+    get_client().show(model)
+    with _VERIFIED_MODELS_LOCK:
+        _VERIFIED_MODELS.add(model)
+
+
+def forget_model(model: str) -> None:
+    """
+    Drop a model from the verified set (e.g. after it was deleted).
+    """
+    with _VERIFIED_MODELS_LOCK:
+        _VERIFIED_MODELS.discard(model)
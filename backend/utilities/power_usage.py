@@ -1,17 +1,40 @@
 import psutil
-import pandas as pd
 import os
 import json
+import atexit
+
+from utilities import json_utils
+from utilities.file_utils import stat_nonempty
 
 df_default = None
 
+# NVML setup (driver handshake, device enumeration) is far costlier than a
+# power reading, so initialise once per process instead of on every sample
+try:
+    import pynvml
+    pynvml.nvmlInit()
+    atexit.register(pynvml.nvmlShutdown)
+    _NVML_HANDLE = pynvml.nvmlDeviceGetHandleByIndex(0)
+    _GPU_NAME = pynvml.nvmlDeviceGetName(_NVML_HANDLE)
+    if isinstance(_GPU_NAME, bytes):
+        _GPU_NAME = _GPU_NAME.decode("utf-8")
+except Exception:
+    _NVML_HANDLE = None
+    _GPU_NAME = None
+
+# Prime psutil's CPU counters; later non-blocking calls report the load
+# since the previous call
+psutil.cpu_percent(interval=None)
+
 def get_default_power_usages():
     global df_default
     if df_default is None:
+        import pandas as pd  # deferred: only the power endpoints need it
+
         # --- Process Default Model Data ---
         default_file_path = 'configs/default_power_consumptions.json'
         df_default = pd.DataFrame()
-        if os.path.exists(default_file_path) and os.path.getsize(default_file_path) > 0:
+        if stat_nonempty(default_file_path):
             with open(default_file_path, 'r') as f:
                 default_data = json.load(f)
             df_default = pd.DataFrame(list(default_data.items()), columns=['model', 'power'])
@@ -20,29 +43,71 @@ def get_default_power_usages():
 
 def get_cpu_power_usage():
     try:
-        # Approximate by calculating power per logical CPU
-        load = psutil.cpu_percent(interval=1)
+        # Approximate by calculating power per logical CPU.
+        # interval=None doesn't sleep, so callers' own polling period holds
+        load = psutil.cpu_percent(interval=None)
         return load
     except Exception as e:
         return None
 
 
 def get_gpu_power_usage():
+    if _NVML_HANDLE is None:
+        return None, None
     try:
-        import pynvml
-        pynvml.nvmlInit()
-        handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-        power = pynvml.nvmlDeviceGetPowerUsage(handle) / 1000  # milliwatts to watts
-        name = pynvml.nvmlDeviceGetName(handle)
-        pynvml.nvmlShutdown()
-        return power, name.decode("utf-8") if isinstance(name, bytes) else name
+        power = pynvml.nvmlDeviceGetPowerUsage(_NVML_HANDLE) / 1000  # milliwatts to watts
+        return power, _GPU_NAME
     except Exception as e:
         return None, None
 
+def append_power_entry(local_file_path, entry):
+    # One JSON object per line; appending is O(1) regardless of history size
+    with open(local_file_path, 'ab') as f:
+        f.write(json_utils.dumps(entry) + b'\n')
+
+def migrate_power_history(legacy_file_path, local_file_path):
+    """
+    One-shot conversion of the legacy JSON array report file to JSON Lines.
+    Entries are appended after any lines already present, then the legacy file is removed.
+    A legacy file that fails to parse (e.g. a half-written array) is kept as
+    <name>.corrupt for manual recovery instead.
+    """
+    try:
+        legacy_size = os.stat(legacy_file_path).st_size
+    except FileNotFoundError:
+        return
+    data = []
+    if legacy_size > 0:
+        try:
+            with open(legacy_file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            corrupt_path = legacy_file_path + '.corrupt'
+            os.replace(legacy_file_path, corrupt_path)
+            print(f"Warning: could not parse {legacy_file_path} ({e}); kept it as {corrupt_path}")
+            return
+    with open(local_file_path, 'a', encoding='utf-8') as f:
+        for entry in data:
+            f.write(json.dumps(entry) + '\n')
+    os.remove(legacy_file_path)
+
 def get_power_usage_history(local_file_path):
+    import pandas as pd
+
     df_local = pd.DataFrame()
-    if os.path.exists(local_file_path) and os.path.getsize(local_file_path) > 0:
-        df_local = pd.read_json(local_file_path)
+    if stat_nonempty(local_file_path):
+        try:
+            df_local = pd.read_json(local_file_path, lines=True)
+        except ValueError:
+            # A torn last line (e.g. killed mid-append); keep every line that parses
+            records = []
+            with open(local_file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+            df_local = pd.DataFrame(records)
         if not df_local.empty:
             df_local['date'] = pd.to_datetime(df_local['date'])
     return df_local
\ No newline at end of file
@@ -30,6 +30,13 @@ def _load_prompts(path: str = DEFAULT_PROMPTS_PATH) -> dict:
         return {}
 
 
+def reload_prompts() -> None:
+    """
+    Drop the cached prompts so the next lookup re-reads the prompts file.
+    """
+    _load_prompts.cache_clear()
+
+
 def get_system_prompt(mode: str, default: str = "") -> str:
     """
     Return system prompt string for a given mode (e.g. 'chat', 'vibe_coding', 'image', 'web').
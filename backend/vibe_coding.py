@@ -1,11 +1,13 @@
 ﻿
-import ollama
 from pathlib import Path
 from typing import List, Dict, Any
 import json
 import logging
 
-from utilities.prompt_config import get_system_prompt
+from charset_normalizer import from_bytes
+
+from utilities.ollama_utils import get_client, verify_model
+from utilities.prompt_config import get_system_prompt, reload_prompts
 
 # =============================================================================
 # Configuration Constants
@@ -55,12 +57,18 @@ class VibeCodingChat:
     def __init__(self, model: str = DEFAULT_MODEL):
         self.model = model
         self.conversation_history: List[Dict[str, str]] = []
-        self.code_context: str = ""  # For loaded code files
+        self._code_parts: List[str] = []  # Banners and contents of loaded code files
         self.loaded_files: List[str] = []
 
+        # Shared client, so requests reuse pooled connections to the daemon
+        self._client = get_client()
+
+        # Resolved once; see reload_prompts()
+        self._base_system = get_system_prompt("vibe_coding", DEFAULT_SYSTEM_PROMPT)
+
         # Verify model is available
         try:
-            ollama.show(self.model)
+            verify_model(self.model)
             logger.info(f"✓ Coding model **{self.model}** is ready")
         except Exception as e:
             logger.error(f"Model **{self.model}** not found. Pull it with: ollama pull {self.model}")
@@ -120,22 +128,13 @@ class VibeCodingChat:
             logger.warning(f"Large file: {file_size_mb:.1f}MB - may take time to process")
 
         try:
-            # Try multiple encodings
-            encodings = ["utf-8", "latin-1", "cp1252"]
-            content = None
-
-            for encoding in encodings:
-                try:
-                    with open(file_path, "r", encoding=encoding) as f:
-                        content = f.read()
-                    break
-                except UnicodeDecodeError:
-                    continue
-
-            if content is None:
-                raise UnicodeDecodeError(
-                    "Unknown", b"", 0, 1, "could not decode file with common encodings"
-                )
+            # Read once; UTF-8 is the common case, otherwise sniff the encoding
+            data = path.read_bytes()
+            try:
+                content = data.decode("utf-8")
+            except UnicodeDecodeError:
+                best = from_bytes(data).best()
+                content = str(best) if best is not None else data.decode("utf-8", errors="replace")
 
             # Append to context
             banner = (
@@ -145,7 +144,7 @@ class VibeCodingChat:
                 + "=" * 60
                 + "\n"
             )
-            self.code_context += banner + content
+            self._code_parts += (banner, content)
             self.loaded_files.append(path.name)
 
             result = {
@@ -161,9 +160,19 @@ class VibeCodingChat:
             logger.error(f"Failed to load code file {file_path}: {e}")
             raise
 
+    @property
+    def code_context(self) -> str:
+        """All loaded code files, each preceded by its banner."""
+        return "".join(self._code_parts)
+
+    def reload_prompts(self):
+        """Re-read configs/prompts.json and pick up a changed system prompt."""
+        reload_prompts()
+        self._base_system = get_system_prompt("vibe_coding", DEFAULT_SYSTEM_PROMPT)
+
     def clear_context(self):
         """Clear loaded code context, but keep conversation."""
-        self.code_context = ""
+        self._code_parts = []
         self.loaded_files = []
         logger.info("✓ Cleared code context")
 
@@ -180,13 +189,12 @@ class VibeCodingChat:
         # Build messages
         messages: List[Dict[str, str]] = []
 
-        base_system = get_system_prompt("vibe_coding", DEFAULT_SYSTEM_PROMPT)
-
-        system_content = base_system
-        if self.code_context:
+        system_content = self._base_system
+        code_context = self.code_context
+        if code_context:
             system_content += (
                 "\n\nYou also have the following code context loaded. Use it when helpful:\n"
-                f"{self.code_context}"
+                f"{code_context}"
             )
 
         messages.append({"role": "system", "content": system_content})
@@ -202,7 +210,7 @@ class VibeCodingChat:
         self.conversation_history.append(user_msg)
 
         try:
-            response = ollama.chat(
+            response = self._client.chat(
                 model=self.model,
                 messages=messages,
                 stream=stream,
@@ -251,7 +259,7 @@ class VibeCodingChat:
     def reset(self):
         """Clear everything - history and loaded files."""
         self.conversation_history = []
-        self.code_context = ""
+        self._code_parts = []
         self.loaded_files = []
         logger.info("✓ Reset complete")
 
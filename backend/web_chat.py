@@ -11,13 +11,29 @@ IMPORTANT:
 
 from __future__ import annotations
 
-from typing import List, Dict, Any, Optional, Union
-import json
+from types import MappingProxyType
+from typing import List, Dict, Any, Callable, ClassVar, Mapping, NamedTuple, Optional, Union
+import asyncio
+import atexit
+import io
 import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
 
 import httpx
-from ollama import chat as ollama_chat
+import msgspec
 
+try:
+    import h2  # noqa: F401  (enables httpx's HTTP/2 support)
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+from ollama import AsyncClient, Tool
+from ollama._utils import convert_function_to_tool
+
+from utilities import json_utils
 from utilities.prompt_config import get_system_prompt
 
 
@@ -51,6 +67,18 @@ ENABLE_THINKING = False
 MAX_ITERATIONS = 5
 MAX_TOOL_RESULT_LENGTH = 8000
 
+# Messages (besides the system prompt) re-sent to the model each call; older
+# turns are dropped
+MAX_CONTEXT_MESSAGES = 20
+
+# web_fetch stops reading a page's response after this many bytes; only the
+# first MAX_TOOL_RESULT_LENGTH bytes of a tool result reach the model anyway
+MAX_FETCH_BYTES = MAX_TOOL_RESULT_LENGTH * 4
+
+# Repeated web_search / web_fetch calls within this window are served from memory
+TOOL_CACHE_SIZE = 256
+TOOL_CACHE_TTL = 300.0  # seconds
+
 DEFAULT_SYSTEM_PROMPT = """You are a helpful AI assistant with access to web search.
 When you need current information, use the web_search tool.
 When you need to read a specific webpage, use the web_fetch tool.
@@ -60,11 +88,128 @@ Be concise and accurate in your responses.
 # Ollama web tools endpoints
 _OLLAMA_WEB_BASE = "https://ollama.com/api"
 
+# HTTP/2 multiplexes concurrent tool calls over one connection when h2 is
+# installed; httpx already asks for gzip-compressed responses by default
+_HTTP_SETTINGS: Dict[str, Any] = dict(
+    base_url=_OLLAMA_WEB_BASE,
+    http2=_HTTP2,
+    headers={
+        "Authorization": f"Bearer {API_KEY}",
+        "Content-Type": "application/json",
+    },
+    timeout=20.0,
+    limits=httpx.Limits(max_connections=10, max_keepalive_connections=10, keepalive_expiry=30),
+)
+
+# One pooled client for all tool calls, so repeated searches/fetches reuse
+# kept-alive TLS connections instead of handshaking every time
+_HTTP = httpx.Client(**_HTTP_SETTINGS)
+atexit.register(_HTTP.close)
+
+
+class _AsyncClients(NamedTuple):
+    http: httpx.AsyncClient
+    ollama: AsyncClient
+    # web_search key -> request task, so identical concurrent searches share one
+    inflight: Dict[tuple, "asyncio.Future"]
+
+
+# Async clients' connection pools belong to the event loop that opened them,
+# so keep one pair per loop (the server's loop, or each asyncio.run() in ask())
+_ASYNC_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncClients]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _async_clients() -> _AsyncClients:
+    loop = asyncio.get_running_loop()
+    clients = _ASYNC_CLIENTS.get(loop)
+    if clients is None:
+        clients = _AsyncClients(
+            http=httpx.AsyncClient(**_HTTP_SETTINGS), ollama=AsyncClient(), inflight={}
+        )
+        _ASYNC_CLIENTS[loop] = clients
+    return clients
+
+
+# ============================================================
+# TOOL RESPONSE TYPES
+# ============================================================
+# Responses are decoded straight into these structs (unknown fields are
+# ignored), which is faster and lighter than building dicts of dicts
+class SearchResult(msgspec.Struct, omit_defaults=True):
+    title: Optional[str] = None
+    url: Optional[str] = None
+    content: Optional[str] = None
+
+
+class SearchResponse(msgspec.Struct, omit_defaults=True):
+    results: List[SearchResult] = msgspec.field(default_factory=list)
+
+
+class FetchResponse(msgspec.Struct, omit_defaults=True):
+    title: Optional[str] = None
+    content: Optional[str] = None
+    links: List[str] = msgspec.field(default_factory=list)
+
+
+# System/user/tool messages we add to the history; far smaller than dicts.
+# (Assistant messages are kept as the ollama.Message the model returned.)
+class ChatMessage(msgspec.Struct, frozen=True, omit_defaults=True):
+    role: str
+    content: str
+    tool_name: Optional[str] = None
+
+
+def _wire_messages(messages: List[Any]) -> List[Any]:
+    """Messages as ollama-python accepts them (mappings or ollama.Message)."""
+    return [msgspec.to_builtins(m) if isinstance(m, ChatMessage) else m for m in messages]
+
+
+_SEARCH_DECODER = msgspec.json.Decoder(SearchResponse)
+_FETCH_DECODER = msgspec.json.Decoder(FetchResponse)
+_RESULT_ENCODER = msgspec.json.Encoder()
+
+
+# (tool, *args) -> (expires_at, result); least recently used entries are evicted first
+_TOOL_CACHE: "OrderedDict[tuple, tuple]" = OrderedDict()
+_TOOL_CACHE_LOCK = threading.Lock()
+
+
+def _cache_get(key: tuple) -> Any:
+    with _TOOL_CACHE_LOCK:
+        hit = _TOOL_CACHE.get(key)
+        if hit is None:
+            return None
+        if hit[0] < time.monotonic():
+            del _TOOL_CACHE[key]
+            return None
+        _TOOL_CACHE.move_to_end(key)
+        return hit[1]
+
+
+def _cache_put(key: tuple, result: Any) -> Any:
+    with _TOOL_CACHE_LOCK:
+        _TOOL_CACHE[key] = (time.monotonic() + TOOL_CACHE_TTL, result)
+        _TOOL_CACHE.move_to_end(key)
+        while len(_TOOL_CACHE) > TOOL_CACHE_SIZE:
+            _TOOL_CACHE.popitem(last=False)
+    return result
+
+
+async def aclose_async_clients() -> None:
+    """Close the async clients opened on the running event loop, if any."""
+    clients = _ASYNC_CLIENTS.pop(asyncio.get_running_loop(), None)
+    if clients is not None:
+        await clients.http.aclose()
+        # ollama.AsyncClient has no public close; release its httpx pool directly
+        await clients.ollama._client.aclose()
+
 
 # ============================================================
 # TOOL IMPLEMENTATIONS (these are what the model can call)
 # ============================================================
-def web_search(query: str, max_results: int = 5) -> Dict[str, Any]:
+def web_search(query: str, max_results: int = 5) -> SearchResponse:
     """
     Search the web for relevant results.
 
@@ -78,21 +223,25 @@ def web_search(query: str, max_results: int = 5) -> Dict[str, Any]:
     if not API_KEY:
         raise RuntimeError("API_KEY is empty; web_search cannot authorize.")
 
-    resp = httpx.post(
-        f"{_OLLAMA_WEB_BASE}/web_search",
-        headers={
-            "Authorization": f"Bearer {API_KEY}",
-            "Content-Type": "application/json",
-        },
-        json={"query": query, "max_results": max_results},
-        timeout=20.0,
-    )
+    key = ("web_search", query, max_results)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    resp = _HTTP.post("/web_search", json={"query": query, "max_results": max_results})
     # If auth is wrong, you'll see a 401 here
     resp.raise_for_status()
-    return resp.json()
+    return _cache_put(key, _SEARCH_DECODER.decode(resp.content))
+
+
+def _fetch_result(body: bytearray, complete: bool) -> Union[FetchResponse, Dict[str, Any]]:
+    if complete:
+        return _FETCH_DECODER.decode(body)
+    # A cut-off JSON document won't parse; hand the model the text we did read
+    return {"truncated": True, "partial_response": body.decode("utf-8", errors="replace")}
 
 
-def web_fetch(url: str) -> Dict[str, Any]:
+def web_fetch(url: str) -> Union[FetchResponse, Dict[str, Any]]:
     """
     Fetch a webpage and return its content and links.
 
@@ -105,17 +254,88 @@ def web_fetch(url: str) -> Dict[str, Any]:
     if not API_KEY:
         raise RuntimeError("API_KEY is empty; web_fetch cannot authorize.")
 
-    resp = httpx.post(
-        f"{_OLLAMA_WEB_BASE}/web_fetch",
-        headers={
-            "Authorization": f"Bearer {API_KEY}",
-            "Content-Type": "application/json",
-        },
-        json={"url": url},
-        timeout=20.0,
+    key = ("web_fetch", url)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    body, complete = bytearray(), True
+    with _HTTP.stream("POST", "/web_fetch", json={"url": url}) as resp:
+        resp.raise_for_status()
+        for chunk in resp.iter_bytes():
+            body += chunk
+            if len(body) >= MAX_FETCH_BYTES:
+                complete = False
+                break
+    return _cache_put(key, _fetch_result(body, complete))
+
+
+async def _search_request(key: tuple, query: str, max_results: int) -> SearchResponse:
+    resp = await _async_clients().http.post(
+        "/web_search", json={"query": query, "max_results": max_results}
     )
     resp.raise_for_status()
-    return resp.json()
+    return _cache_put(key, _SEARCH_DECODER.decode(resp.content))
+
+
+async def web_search_async(query: str, max_results: int = 5) -> SearchResponse:
+    """
+    web_search() on the running event loop's shared AsyncClient.
+    Concurrent calls with the same arguments (e.g. duplicate tool calls in
+    one model turn) wait on a single upstream request.
+    """
+    if not API_KEY:
+        raise RuntimeError("API_KEY is empty; web_search cannot authorize.")
+
+    key = ("web_search", query, max_results)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    inflight = _async_clients().inflight
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_search_request(key, query, max_results))
+        inflight[key] = task
+        task.add_done_callback(lambda _: inflight.pop(key, None))
+    # shield: one waiter being cancelled mustn't cancel the others' request
+    return await asyncio.shield(task)
+
+
+async def web_fetch_async(url: str) -> Union[FetchResponse, Dict[str, Any]]:
+    """web_fetch() on the running event loop's shared AsyncClient."""
+    if not API_KEY:
+        raise RuntimeError("API_KEY is empty; web_fetch cannot authorize.")
+
+    key = ("web_fetch", url)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    body, complete = bytearray(), True
+    async with _async_clients().http.stream("POST", "/web_fetch", json={"url": url}) as resp:
+        resp.raise_for_status()
+        async for chunk in resp.aiter_bytes():
+            body += chunk
+            if len(body) >= MAX_FETCH_BYTES:
+                complete = False
+                break
+    return _cache_put(key, _fetch_result(body, complete))
+
+
+def _truncate_utf8(data: bytes, limit: int) -> str:
+    """
+    Decode at most `limit` bytes of UTF-8 `data`, cutting before a character
+    that would be split rather than slicing the decoded string.
+    """
+    if len(data) <= limit:
+        return data.decode("utf-8")
+    cut = limit
+    # data[cut] is the first dropped byte; if it continues a character, back
+    # up to that character's lead byte (at most 3 steps)
+    while cut > 0 and (data[cut] & 0xC0) == 0x80:
+        cut -= 1
+    return data[:cut].decode("utf-8")
 
 
 def _normalize_tool_args(tool_args: Union[str, Dict[str, Any], None]) -> Dict[str, Any]:
@@ -129,16 +349,27 @@ def _normalize_tool_args(tool_args: Union[str, Dict[str, Any], None]) -> Dict[st
         return tool_args
     if isinstance(tool_args, str):
         tool_args = tool_args.strip()
-        if not tool_args:
+        # Trivial payloads models often send; no need to run the parser
+        if tool_args in ("", "{}", "null"):
             return {}
         try:
-            return json.loads(tool_args)
-        except json.JSONDecodeError:
+            return json_utils.loads(tool_args)
+        except json_utils.JSONDecodeError:
             # sometimes models return sloppy JSON; surface it
             raise ValueError(f"Tool arguments were not valid JSON: {tool_args}")
     raise TypeError(f"Unsupported tool_args type: {type(tool_args)}")
 
 
+# Built once per process: the system message (shared, never mutated) and the
+# tool schemas, which ollama would otherwise re-derive from the functions'
+# signatures and docstrings on every chat call
+_SYSTEM_PROMPT = get_system_prompt("web", DEFAULT_SYSTEM_PROMPT)
+_SYSTEM_MESSAGES: List[ChatMessage] = (
+    [ChatMessage(role="system", content=_SYSTEM_PROMPT)] if _SYSTEM_PROMPT else []
+)
+_TOOLS_SCHEMA: List[Tool] = [convert_function_to_tool(fn) for fn in (web_search, web_fetch)]
+
+
 # ============================================================
 # SESSION
 # ============================================================
@@ -148,103 +379,138 @@ class WebChatSession:
     with optional multi-step tool use.
     """
 
+    # tool name -> async implementation; shared, read-only
+    _TOOLS: ClassVar[Mapping[str, Callable[..., Any]]] = MappingProxyType(
+        {
+            "web_search": web_search_async,
+            "web_fetch": web_fetch_async,
+        }
+    )
+
     def __init__(self, model: str = MODEL_NAME):
         self.model = model
-        self.messages: List[Dict[str, Any]] = []
-
-        system_prompt = get_system_prompt("web", DEFAULT_SYSTEM_PROMPT)
-        if system_prompt:
-            self.messages.append({"role": "system", "content": system_prompt})
-
-        # tool name -> function
-        self.available_tools = {
-            "web_search": web_search,
-            "web_fetch": web_fetch,
-        }
+        # ChatMessage structs plus the ollama.Message replies from the model
+        self.messages: List[Any] = list(_SYSTEM_MESSAGES)
 
         if not API_KEY:
             logger.warning("API_KEY is empty. Web tools will fail with authorization errors.")
 
     def reset(self):
         """Reset conversation history but keep the model."""
-        self.messages = []
-        system_prompt = get_system_prompt("web", DEFAULT_SYSTEM_PROMPT)
-        if system_prompt:
-            self.messages.append({"role": "system", "content": system_prompt})
+        self.messages = list(_SYSTEM_MESSAGES)
 
     def ask(self, user_input: str) -> str:
+        """
+        Blocking wrapper around ask_async(), for callers without an event loop.
+        """
+        async def _run() -> str:
+            try:
+                return await self.ask_async(user_input)
+            finally:
+                # This loop ends with asyncio.run(); don't leak its connections
+                await aclose_async_clients()
+
+        return asyncio.run(_run())
+
+    def _trim_context(self) -> None:
+        """
+        Keep the system prompt plus at most MAX_CONTEXT_MESSAGES recent messages,
+        starting the window on a user message so no tool result loses its call.
+        """
+        head = self.messages[:len(_SYSTEM_MESSAGES)]
+        history = self.messages[len(head):]
+        if len(history) <= MAX_CONTEXT_MESSAGES:
+            return
+        window = history[-MAX_CONTEXT_MESSAGES:]
+        start = next((i for i, m in enumerate(window) if m.role == "user"), len(window) - 1)
+        self.messages = head + window[start:]
+
+    async def _run_tool(self, tool_call: Any) -> ChatMessage:
+        """Run one requested tool and return its role="tool" message."""
+        tool_name = tool_call.function.name
+        tool_args = _normalize_tool_args(tool_call.function.arguments)
+
+        fn = self._TOOLS.get(tool_name)
+        if not fn:
+            msg = f"Tool {tool_name} not found"
+            logger.error(msg)
+            return ChatMessage(role="tool", tool_name=tool_name, content=msg)
+
+        try:
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Calling tool %s args=%s", tool_name, tool_args)
+            result = await fn(**tool_args)
+            # Real JSON (not a Python repr) for the model, cut before decoding
+            result_str = _truncate_utf8(_RESULT_ENCODER.encode(result), MAX_TOOL_RESULT_LENGTH)
+            return ChatMessage(role="tool", tool_name=tool_name, content=result_str)
+        except Exception as e:
+            # This is where youll see 401s, timeouts, etc.
+            logger.exception("Tool %s FAILED args=%s", tool_name, tool_args)
+            return ChatMessage(
+                role="tool", tool_name=tool_name, content=f"Error calling {tool_name}: {e}"
+            )
+
+    async def ask_async(self, user_input: str) -> str:
         """
         Single-turn entry point.
         Handles multi-iteration tool calls internally, returns final text.
         """
-        self.messages.append({"role": "user", "content": user_input})
+        self.messages.append(ChatMessage(role="user", content=user_input))
+        self._trim_context()
 
-        final_chunks: List[str] = []
+        # Assistant text from every iteration, separated by blank lines
+        buf = io.StringIO()
 
-        for iteration in range(1, MAX_ITERATIONS + 1):
-            logger.info("WebChat iteration %d/%d", iteration, MAX_ITERATIONS)
+        iteration = 0
+        while iteration < MAX_ITERATIONS:
+            iteration += 1
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("WebChat iteration %d/%d", iteration, MAX_ITERATIONS)
 
-            # Call the model. We pass our tool callables (web_search/web_fetch).
+            # Call the model with the prebuilt web_search/web_fetch schemas
             try:
-                response = ollama_chat(
+                response = await _async_clients().ollama.chat(
                     model=self.model,
-                    messages=self.messages,
-                    tools=[web_search, web_fetch],
+                    messages=_wire_messages(self.messages),
+                    tools=_TOOLS_SCHEMA,
                     think=ENABLE_THINKING,
                 )
             except Exception as e:
                 logger.exception("ERROR calling model: %s", e)
                 raise
 
+            # ollama.Message always defines content/tool_calls (None when absent)
+            message = response.message
+
             # Capture assistant content
-            if getattr(response.message, "content", None):
-                final_chunks.append(response.message.content)
+            if message.content:
+                buf.write(message.content)
+                buf.write("\n\n")
 
             # Save assistant message
-            self.messages.append(response.message)
+            self.messages.append(message)
 
             # If no tools requested, were done
-            tool_calls = getattr(response.message, "tool_calls", None)
+            tool_calls = message.tool_calls
             if not tool_calls:
                 break
 
-            # Execute requested tools
-            for tool_call in tool_calls:
-                tool_name = tool_call.function.name
-                tool_args = _normalize_tool_args(tool_call.function.arguments)
-
-                fn = self.available_tools.get(tool_name)
-                if not fn:
-                    msg = f"Tool {tool_name} not found"
-                    logger.error(msg)
-                    self.messages.append(
-                        {"role": "tool", "tool_name": tool_name, "content": msg}
-                    )
-                    continue
-
-                try:
-                    logger.info("Calling tool %s args=%s", tool_name, tool_args)
-                    result = fn(**tool_args)
-                    result_str = str(result)[:MAX_TOOL_RESULT_LENGTH]
-                    self.messages.append(
-                        {"role": "tool", "tool_name": tool_name, "content": result_str}
+            # Execute requested tools concurrently; results keep the call order
+            results = await asyncio.gather(
+                *[self._run_tool(tc) for tc in tool_calls], return_exceptions=True
+            )
+            for tool_call, result in zip(tool_calls, results):
+                if isinstance(result, BaseException):
+                    # e.g. arguments that weren't valid JSON
+                    tool_name = tool_call.function.name
+                    logger.error("Tool %s FAILED: %s", tool_name, result)
+                    result = ChatMessage(
+                        role="tool", tool_name=tool_name, content=f"Error calling {tool_name}: {result}"
                     )
-                    logger.info("Tool %s OK", tool_name)
-                except Exception as e:
-                    # This is where youll see 401s, timeouts, etc.
-                    logger.exception("Tool %s FAILED args=%s", tool_name, tool_args)
-                    self.messages.append(
-                        {
-                            "role": "tool",
-                            "tool_name": tool_name,
-                            "content": f"Error calling {tool_name}: {e}",
-                        }
-                    )
-
+                self.messages.append(result)
             # Loop again to let the model read tool results and respond
-            continue
 
-        return ("\n\n".join([c for c in final_chunks if c]).strip()) or "I couldn't generate a response."
+        return buf.getvalue().strip() or "I couldn't generate a response."
 
 
 # Convenience alias for default model (server.py imports this)